@@ -0,0 +1,81 @@
+import asyncio
+from typing import Iterable, List, Sequence, Tuple
+
+from advent_of_code_2019_python.intcode_computer import IntcodeComputer
+
+
+class AsyncIntcodeComputer:
+    """Runs an IntcodeComputer as an asyncio task with queue-based input and output channels.
+
+    The computer runs until it needs input, sends the produced outputs to every connected output queue and then
+    awaits its input queue. Scheduling between connected computers is left to the event loop.
+    """
+
+    def __init__(self, computer: IntcodeComputer):
+        self.computer = computer
+        self.inputs: asyncio.Queue = asyncio.Queue()
+        self.output_queues: List[asyncio.Queue] = []
+        # Every value the computer has output, in order
+        self.outputs: List[int] = []
+
+    def send(self, *values: int):
+        """Queue values to the input channel without waiting."""
+        for value in values:
+            self.inputs.put_nowait(value)
+
+    def connect_to(self, other: 'AsyncIntcodeComputer'):
+        """Send all future outputs of this computer to the input channel of another one."""
+        self.output_queues.append(other.inputs)
+
+    async def run(self) -> List[int]:
+        """Runs the program until it halts.
+
+        Returns:
+            All outputs of the program.
+        """
+        computer = self.computer
+        while True:
+            outputs = computer.run_until_input()
+            for output in outputs:
+                for queue in self.output_queues:
+                    queue.put_nowait(output)
+            self.outputs.extend(outputs)
+            if computer.halted:
+                return self.outputs
+            computer.add_inputs(await self.inputs.get())
+            while not self.inputs.empty():
+                computer.add_inputs(self.inputs.get_nowait())
+
+
+def pipeline(n: int) -> List[Tuple[int, int]]:
+    """Edges connecting computer i to computer i + 1."""
+    return [(i, i + 1) for i in range(n - 1)]
+
+
+def ring(n: int) -> List[Tuple[int, int]]:
+    """Edges of a pipeline where the last computer also feeds back to the first."""
+    return [(i, (i + 1) % n) for i in range(n)]
+
+
+def star(n: int, hub: int = 0) -> List[Tuple[int, int]]:
+    """Edges from a hub computer to every other computer and back."""
+    edges = []
+    for i in range(n):
+        if i != hub:
+            edges += [(hub, i), (i, hub)]
+    return edges
+
+
+def connect(computers: Sequence[AsyncIntcodeComputer], edges: Iterable[Tuple[int, int]]):
+    """Connect computers by edges (source index, destination index). Outputs are broadcast to every destination."""
+    for source, destination in edges:
+        computers[source].connect_to(computers[destination])
+
+
+async def run_network(computers: Sequence[AsyncIntcodeComputer]) -> List[List[int]]:
+    """Runs connected computers concurrently until all of them halt.
+
+    Returns:
+        Outputs of each computer.
+    """
+    return await asyncio.gather(*(computer.run() for computer in computers))
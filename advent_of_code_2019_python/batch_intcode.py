@@ -0,0 +1,120 @@
+from typing import List, Optional, Sequence
+
+import numpy as np  # type: ignore
+
+from advent_of_code_2019_python.intcode_computer import PARAMETER_COUNTS
+
+# Values at or beyond this magnitude do not fit in an int64 cell
+_INT64_LIMIT = float(2 ** 63)
+
+
+class BatchIntcodeComputer:
+    """Runs many independent instances of an Intcode program in lock-step.
+
+    Memory of all instances is one 2-D int64 array with a row per instance. Every step decodes the current
+    instruction of each running instance, groups the instances by opcode and executes each group with vectorized
+    NumPy operations, so the Python-level dispatch cost is per opcode group instead of per instance. Instruction
+    pointers may diverge freely; halted instances are masked out.
+
+    Cells are int64. Additions and multiplications that would overflow raise OverflowError, use IntcodeComputer for
+    programs that need arbitrary precision.
+    """
+
+    def __init__(self, intcode: Sequence[int], instances: int, inputs: Optional[np.ndarray] = None):
+        """
+        Arguments:
+            intcode: The program every instance starts with. Rows of `memory` can be modified before running.
+            instances: Number of instances.
+            inputs: Optional 2-D array with the input values of each instance in its row.
+        """
+        self.memory = np.tile(np.asarray(intcode, dtype=np.int64), (instances, 1))
+        self.instr_pointer = np.zeros(instances, dtype=np.int64)
+        self.relative_base = np.zeros(instances, dtype=np.int64)
+        self.halted = np.zeros(instances, dtype=bool)
+        self.inputs = np.zeros((instances, 0), dtype=np.int64) if inputs is None else np.asarray(inputs, np.int64)
+        self.input_pointer = np.zeros(instances, dtype=np.int64)
+        self.outputs: List[List[int]] = [[] for _ in range(instances)]
+        self.steps = 0
+
+    def _grow(self, max_address: int):
+        """Extend memory of all instances with zero columns so that the address is valid."""
+        columns = self.memory.shape[1]
+        if max_address >= columns:
+            new_columns = max(max_address + 1, 2 * columns)
+            self.memory = np.pad(self.memory, ((0, 0), (0, new_columns - columns)))
+
+    def _addresses(self, rows: np.ndarray, instructions: np.ndarray, param: int) -> np.ndarray:
+        """Resolve the address of the given parameter (1-3) of the current instruction of each row."""
+        ip = self.instr_pointer[rows] + param
+        self._grow(int(ip.max()))
+        mode = instructions // 10 ** (param + 1) % 10
+        addresses = np.where(mode == 1, ip, self.memory[rows, ip] + np.where(mode == 2, self.relative_base[rows], 0))
+        if np.any(addresses < 0):
+            raise IndexError('Negative memory address')
+        self._grow(int(addresses.max()))
+        return addresses
+
+    def step(self):
+        """Execute one instruction in every running instance."""
+        running = np.flatnonzero(~self.halted)
+        if not len(running):
+            return
+        self._grow(int(self.instr_pointer[running].max()))
+        instructions = self.memory[running, self.instr_pointer[running]]
+        opcodes = instructions % 100
+        for opcode in np.unique(opcodes):
+            opcode = int(opcode)
+            group = opcodes == opcode
+            rows = running[group]
+            if opcode == 99:
+                self.halted[rows] = True
+                continue
+            if opcode not in PARAMETER_COUNTS:
+                raise ValueError(f'Unknown opcode {opcode}')
+            group_instructions = instructions[group]
+            addresses = [self._addresses(rows, group_instructions, param)
+                         for param in range(1, PARAMETER_COUNTS[opcode] + 1)]
+            memory = self.memory
+            if opcode in (1, 2, 7, 8):
+                a = memory[rows, addresses[0]]
+                b = memory[rows, addresses[1]]
+                if opcode == 1:
+                    if np.any(np.abs(a.astype(float) + b) >= _INT64_LIMIT):
+                        raise OverflowError('Addition does not fit in int64')
+                    result = a + b
+                elif opcode == 2:
+                    if np.any(np.abs(a.astype(float) * b) >= _INT64_LIMIT):
+                        raise OverflowError('Multiplication does not fit in int64')
+                    result = a * b
+                elif opcode == 7:
+                    result = (a < b).astype(np.int64)
+                else:
+                    result = (a == b).astype(np.int64)
+                memory[rows, addresses[2]] = result
+                self.instr_pointer[rows] += 4
+            elif opcode == 3:
+                input_pointer = self.input_pointer[rows]
+                if np.any(input_pointer >= self.inputs.shape[1]):
+                    raise IndexError('Instance ran out of inputs')
+                memory[rows, addresses[0]] = self.inputs[rows, input_pointer]
+                self.input_pointer[rows] += 1
+                self.instr_pointer[rows] += 2
+            elif opcode == 4:
+                for row, value in zip(rows, memory[rows, addresses[0]]):
+                    self.outputs[row].append(int(value))
+                self.instr_pointer[rows] += 2
+            elif opcode in (5, 6):
+                condition = memory[rows, addresses[0]] != 0
+                jump = condition if opcode == 5 else ~condition
+                self.instr_pointer[rows] = np.where(jump, memory[rows, addresses[1]], self.instr_pointer[rows] + 3)
+            else:
+                self.relative_base[rows] += memory[rows, addresses[0]]
+                self.instr_pointer[rows] += 2
+        self.steps += 1
+
+    def run(self, max_steps: Optional[int] = None):
+        """Step all instances until every one of them has halted, or until max_steps lock-steps have run."""
+        steps = 0
+        while not self.halted.all() and (max_steps is None or steps < max_steps):
+            self.step()
+            steps += 1
@@ -1,8 +1,9 @@
 from collections import namedtuple
-from math import atan2, degrees, gcd
-from typing import List, Optional, Set, Tuple
+from math import gcd
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import click
+import numpy as np  # type: ignore
 
 Coord = namedtuple('Coord', ['x', 'y'])
 
@@ -17,47 +18,127 @@ def parse_asteroids(filename: str) -> Set[Coord]:
     return asteroids
 
 
-def _calculate_unique_lines_of_sight(asteroids: Set[Coord], location: Coord) -> Set[Coord]:
-    """Calculates unique lines of sight, which means lines which directly lead to one or more asteroids."""
-    unique_line_of_sights = set()
-    for asteroid in asteroids:
-        dx, dy = asteroid.x - location.x, asteroid.y - location.y
-        divisor = gcd(dx, dy)
-        if divisor:
-            unique_line_of_sights.add(Coord(dx // divisor, dy // divisor))
-    return unique_line_of_sights
+# Number of station and asteroid pairs processed at once when counting visible asteroids
+_PAIRS_PER_BLOCK = 4_000_000
+# Largest number of offsets for which direction keys are precomputed in a table
+_MAX_TABLE_SIZE = 2 ** 24
+
+
+def _as_array(asteroids: Iterable[Coord]) -> np.ndarray:
+    """Asteroid coordinates as an (N, 2) int64 array, sorted by x and then y."""
+    return np.array(sorted(asteroids), dtype=np.int64).reshape(-1, 2)
+
+
+def _direction_keys(dx: np.ndarray, dy: np.ndarray, extent: int) -> np.ndarray:
+    """One integer per offset identifying its direction: the offset divided by the gcd of its components.
+
+    Offsets must be within (-extent, extent) on both axes. A zero offset gets the key of direction (0, 0).
+    """
+    divisor = np.gcd(dx, dy)
+    divisor[divisor == 0] = 1
+    return (dx // divisor + extent) * (2 * extent + 1) + dy // divisor + extent
+
+
+def count_visible(asteroids: Iterable[Coord]) -> Dict[Coord, int]:
+    """Counts the asteroids visible from each asteroid, which is the number of distinct directions to the others.
+
+    Directions are looked up for blocks of stations against all asteroids at once, and counted by sorting each row
+    of direction keys. When the map is small enough, the direction key of every possible offset is computed once
+    into a table, so each pair is a single table lookup. Otherwise the keys are computed with a vectorized gcd.
+    """
+    coords = _as_array(asteroids)
+    if not len(coords):
+        return {}
+    extent = int(coords.max() - coords.min()) + 1
+    width = 2 * extent + 1
+    x = coords[:, 0] - coords.min()
+    y = coords[:, 1] - coords.min()
+    if width * width <= _MAX_TABLE_SIZE:
+        offsets = np.arange(-extent, extent + 1)
+        table = _direction_keys(np.repeat(offsets, width), np.tile(offsets, width), extent).astype(np.int32)
+        # Offset (dx, dy) is at dx * width + dy + center of the table, which is a difference of these positions
+        positions = (x * width + y).astype(np.int32)
+        center = extent * width + extent
+
+        def keys(stations: slice) -> np.ndarray:
+            return table[positions - positions[stations, np.newaxis] + center]
+    else:
+        def keys(stations: slice) -> np.ndarray:
+            return _direction_keys(x - x[stations, np.newaxis], y - y[stations, np.newaxis], extent)
+
+    counts = np.zeros(len(coords), dtype=np.int64)
+    block = max(1, _PAIRS_PER_BLOCK // len(coords))
+    for start in range(0, len(coords), block):
+        stations = slice(start, start + block)
+        block_keys = keys(stations)
+        block_keys.sort(axis=1)
+        # Distinct keys in each row, minus the station itself with direction (0, 0)
+        counts[stations] = (np.diff(block_keys, axis=1) != 0).sum(axis=1)
+    return {Coord(cx, cy): count for (cx, cy), count in zip(coords.tolist(), counts.tolist())}
 
 
 def find_best_location(asteroids: Set[Coord]) -> Tuple[Optional[Coord], int]:
     """Find location with maximum visible asteroids."""
-    max_visible_asteroids = 0
     best_location = None
-    for asteroid in asteroids:
-        visible_asteroids = len(_calculate_unique_lines_of_sight(asteroids, asteroid))
+    max_visible_asteroids = 0
+    for location, visible_asteroids in count_visible(asteroids).items():
         if visible_asteroids > max_visible_asteroids:
             max_visible_asteroids = visible_asteroids
-            best_location = asteroid
+            best_location = location
     return best_location, max_visible_asteroids
 
 
+def _angles_and_queues(asteroids: Iterable[Coord],
+                       location: Coord) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Sorts the other asteroids by direction from the location and distance within each direction.
+
+    Returns:
+        The sorted coordinates, the angle of each one clockwise from up and the position of each one in the
+        distance queue of its direction.
+    """
+    coords = _as_array(asteroid for asteroid in asteroids if asteroid != location)
+    dx = coords[:, 0] - location.x
+    dy = coords[:, 1] - location.y
+    extent = int(max(np.abs(dx).max(initial=0), np.abs(dy).max(initial=0))) + 1
+    keys = _direction_keys(dx, dy, extent)
+    distances = np.abs(dx) + np.abs(dy)
+    order = np.lexsort((distances, keys))
+    coords, dx, dy, keys = coords[order], dx[order], dy[order], keys[order]
+    group_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    group_sizes = np.diff(np.r_[group_starts, len(keys)])
+    queue_positions = np.arange(len(keys)) - np.repeat(group_starts, group_sizes)
+    # Angles of the reduced directions, so that all asteroids in one direction get exactly the same angle
+    divisor = np.gcd(dx, dy)
+    angles = np.arctan2(dx // divisor, -(dy // divisor)) % (2 * np.pi)
+    return coords, angles, queue_positions
+
+
+def direction_index(asteroids: Iterable[Coord], location: Coord) -> Dict[Coord, List[Coord]]:
+    """Groups the other asteroids by their direction from the location.
+
+    Returns:
+        Dict from each reduced direction, in clockwise order starting from up, to the asteroids in that direction
+        nearest first.
+    """
+    coords, angles, queue_positions = _angles_and_queues(asteroids, location)
+    index: Dict[Coord, List[Coord]] = {}
+    for i in np.lexsort((queue_positions, angles)).tolist():
+        cx, cy = coords[i].tolist()
+        dx, dy = cx - location.x, cy - location.y
+        divisor = gcd(dx, dy)
+        index.setdefault(Coord(dx // divisor, dy // divisor), []).append(Coord(cx, cy))
+    return index
+
+
 def vaporize_asteroids(asteroids: Set[Coord], location: Coord) -> List[Coord]:
     """Vaporize asteroids with a lazer turning 360 degrees multiple times. Visible asteroids will be destroyed
     each rotation.
+
+    The n-th asteroid in a direction is destroyed on the n-th rotation, so the order is found in one sort by
+    rotation and then angle.
     """
-    vaporized = []
-    remaining_asteroids = asteroids.copy()
-    remaining_asteroids.remove(location)
-    while remaining_asteroids:
-        loss = _calculate_unique_lines_of_sight(remaining_asteroids, location)
-        loss_sorted = sorted(loss, key=lambda coord: degrees(atan2(coord.x, -coord.y)) % 360)
-        for los in loss_sorted:
-            pos = location
-            while pos := Coord(pos.x + los.x, pos.y + los.y):
-                if pos in remaining_asteroids:
-                    remaining_asteroids.remove(pos)
-                    vaporized.append(pos)
-                    break
-    return vaporized
+    coords, angles, queue_positions = _angles_and_queues(asteroids, location)
+    return [Coord(cx, cy) for cx, cy in coords[np.lexsort((angles, queue_positions))].tolist()]
 
 
 @click.command()
@@ -1,40 +1,41 @@
-from collections import defaultdict, namedtuple
-from typing import Dict, Tuple
+from typing import Tuple
 
 import click
 import numpy as np  # type: ignore
 
 from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.grid import GrowableGrid
 
-Position = namedtuple('Position', ['x', 'y'])
 
-
-def paint_panels(intcode_computer: IntcodeComputer, initial_color: int) -> Dict[Position, int]:
-    """Paints panels and returns a dictionary of all panels that were painted at least once.
+def paint_panels(intcode_computer: IntcodeComputer, initial_color: int) -> GrowableGrid:
+    """Paints panels and returns a grid of the panel colors. Its length is the number of panels painted at least once.
 
     Arguments:
         intcode_computer: Computer loaded with the correct program.
         initial_color: Color of the first panel. 0 for black, 1 for white.
 
     Returns:
-        Dictionary of painted positions and respective colors.
+        Grid of panel colors by (x, y), y growing upwards.
     """
-    colors: Dict[Position, int] = defaultdict(int)
-    position = Position(x=0, y=0)
+    panels = GrowableGrid()
+    x, y = 0, 0
     dx = 0
     dy = 1
-    colors[position] = initial_color
+    if initial_color:
+        panels.set(x, y, initial_color)
 
     while not intcode_computer.halted:
-        intcode_computer.set_inputs(colors[position])
-        color = intcode_computer.compute()
-        if color is not None:
-            colors[position] = color
-        direction = intcode_computer.compute()
+        intcode_computer.add_inputs(panels.get(x, y))
+        outputs = intcode_computer.run_until_input()
+        if not outputs:
+            break
+        color, direction = outputs
+        panels.set(x, y, color)
         dx, dy = turn_right(dx, dy) if direction else turn_left(dx, dy)
-        position = Position(position.x + dx, position.y + dy)
+        x += dx
+        y += dy
 
-    return colors
+    return panels
 
 
 def turn_left(x: int, y: int) -> Tuple[int, int]:
@@ -47,24 +48,16 @@ def turn_right(x: int, y: int) -> Tuple[int, int]:
     return y, -x
 
 
-def generate_image(panels: Dict[Position, int]) -> np.ndarray:
-    """Generates an array from painted panels dict.
+def generate_image(panels: GrowableGrid) -> np.ndarray:
+    """Generates an array from the painted panels.
 
     Arguments:
-        panels: Dict of panel positions and respective colors (0=black, 1=white).
+        panels: Grid of panel colors (0=black, 1=white).
 
     Returns:
-        Numpy array with colors in their correct places. Size is the smallest fitting size.
+        Numpy array with colors in their correct places, top row first. Size is the smallest fitting size.
     """
-    xs = []
-    ys = []
-    for panel in panels:
-        xs.append(panel.x)
-        ys.append(-panel.y)
-    image = np.zeros((max(ys) + 1, max(xs) + 1), dtype=np.int8)
-    for panel in panels:
-        image[-panel.y][panel.x] = panels[panel]
-    return image
+    return panels.to_array(y_up=True)
 
 
 @click.command()
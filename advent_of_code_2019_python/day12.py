@@ -1,5 +1,5 @@
-from itertools import permutations
-from typing import List
+import multiprocessing
+from typing import Iterator, List, Optional, Tuple
 
 import attr
 import click
@@ -47,69 +47,275 @@ def parse_input(input_file: str) -> List[Moon]:
     return moons
 
 
+# Up to this many bodies, gravity is summed over all pairs at once; above it, from sorted positions per axis
+PAIRWISE_LIMIT = 64
+
+
+def _gravity(positions: np.ndarray) -> np.ndarray:
+    """Velocity change of each body: per axis, the number of bodies ahead minus the number of bodies behind.
+
+    For a few bodies this is the sum of np.sign over all pairwise differences. The same counts come from binary
+    searches in the sorted positions of each axis, which takes O(N log N) time and O(N) memory for many bodies.
+    """
+    if len(positions) <= PAIRWISE_LIMIT:
+        return np.sign(positions[np.newaxis, :, :] - positions[:, np.newaxis, :]).sum(axis=1)
+    change = np.empty_like(positions)
+    for axis in range(positions.shape[1]):
+        column = positions[:, axis]
+        ordered = np.sort(column)
+        behind = np.searchsorted(ordered, column, side='left')
+        ahead = len(column) - np.searchsorted(ordered, column, side='right')
+        change[:, axis] = ahead - behind
+    return change
+
+
+class MoonSystem:
+    """Bodies attracting each other one unit per step along each axis, simulated with NumPy.
+
+    Positions and velocities are (N, 3) int64 arrays with a row per body.
+    """
+
+    def __init__(self, positions: np.ndarray, velocities: Optional[np.ndarray] = None):
+        self.positions = np.array(positions, dtype=np.int64).reshape(-1, 3)
+        self.velocities = (np.zeros_like(self.positions) if velocities is None
+                           else np.array(velocities, dtype=np.int64).reshape(-1, 3))
+        self.steps = 0
+
+    @classmethod
+    def from_moons(cls, moons: List[Moon]) -> 'MoonSystem':
+        return cls([attr.astuple(moon.position) for moon in moons], [attr.astuple(moon.velocity) for moon in moons])
+
+    def update_moons(self, moons: List[Moon]):
+        """Write the current positions and velocities back into Moon objects, in the same order."""
+        for moon, position, velocity in zip(moons, self.positions.tolist(), self.velocities.tolist()):
+            moon.position.x, moon.position.y, moon.position.z = position
+            moon.velocity.x, moon.velocity.y, moon.velocity.z = velocity
+
+    def step(self, steps: int = 1):
+        """Apply gravity and then velocity, `steps` times."""
+        positions = self.positions
+        velocities = self.velocities
+        for _ in range(steps):
+            velocities += _gravity(positions)
+            positions += velocities
+        self.steps += steps
+
+    def potential_energy(self) -> np.ndarray:
+        return np.abs(self.positions).sum(axis=1)
+
+    def kinetic_energy(self) -> np.ndarray:
+        return np.abs(self.velocities).sum(axis=1)
+
+    def total_energy(self) -> int:
+        """Sum over the bodies of potential energy times kinetic energy."""
+        return int((self.potential_energy() * self.kinetic_energy()).sum())
+
+    def energy_dtype(self) -> np.dtype:
+        """Record type of one step of an energy trajectory."""
+        bodies = len(self.positions)
+        return np.dtype([('step', np.int64), ('total', np.int64), ('potential', np.int64, (bodies,)),
+                         ('kinetic', np.int64, (bodies,))])
+
+    def energy_trajectory(self, steps: int, chunk_size: int = 10000) -> Iterator[np.ndarray]:
+        """Runs the simulation and yields the energies after every step, in chunks.
+
+        Arguments:
+            steps: Number of steps to run.
+            chunk_size: Number of steps in each chunk.
+
+        Yields:
+            Structured arrays of energy_dtype() with the step number, the total energy, and the potential and
+            kinetic energy of each body, one record per step. Each chunk is a new array.
+        """
+        positions = self.positions
+        velocities = self.velocities
+        remaining = steps
+        while remaining > 0:
+            chunk = np.empty(min(chunk_size, remaining), dtype=self.energy_dtype())
+            # States of the chunk are collected first, and their energies computed for the whole chunk at once
+            position_history = np.empty((len(chunk),) + positions.shape, dtype=np.int64)
+            velocity_history = np.empty_like(position_history)
+            for i in range(len(chunk)):
+                velocities += _gravity(positions)
+                positions += velocities
+                position_history[i] = positions
+                velocity_history[i] = velocities
+            chunk['step'] = np.arange(self.steps + 1, self.steps + len(chunk) + 1)
+            chunk['potential'] = np.abs(position_history).sum(axis=2)
+            chunk['kinetic'] = np.abs(velocity_history).sum(axis=2)
+            chunk['total'] = (chunk['potential'] * chunk['kinetic']).sum(axis=1)
+            self.steps += len(chunk)
+            remaining -= len(chunk)
+            yield chunk
+
+    def write_energy_trajectory(self, filename: str, steps: int, chunk_size: int = 10000) -> np.ndarray:
+        """Runs the simulation and writes the energy after every step to a .npy file as it goes.
+
+        The file is written through a memory map one chunk at a time, so memory use does not grow with the number
+        of steps. Read it back with np.load(filename, mmap_mode='r').
+
+        Returns:
+            The memory-mapped trajectory.
+        """
+        trajectory = np.lib.format.open_memmap(filename, mode='w+', dtype=self.energy_dtype(), shape=(steps,))
+        start = 0
+        for chunk in self.energy_trajectory(steps, chunk_size):
+            trajectory[start:start + len(chunk)] = chunk
+            start += len(chunk)
+        trajectory.flush()
+        return trajectory
+
+
 def apply_gravity(moons: List[Moon], steps: int):
     """Repeatedly calculate velocities based on moon positions and update positions based on those velocities."""
-    for _ in range(steps):
-        for this, other in permutations(moons, 2):
-            this.update_velocity(other)
-        for moon in moons:
-            moon.apply_velocity()
+    system = MoonSystem.from_moons(moons)
+    system.step(steps)
+    system.update_moons(moons)
 
 
 def calculate_total_energy(moons: List[Moon]) -> int:
     """Calculates total energy as a sum of products of potential and kinetic energy."""
-    total_energy = 0
-    for moon in moons:
-        potential_energy = abs(moon.position.x) + abs(moon.position.y) + abs(moon.position.z)
-        kinetic_energy = abs(moon.velocity.x) + abs(moon.velocity.y) + abs(moon.velocity.z)
-        total_energy += potential_energy * kinetic_energy
-    return total_energy
+    return MoonSystem.from_moons(moons).total_energy()
 
 
-def calculate_loop(moons: List[Moon]) -> int:
-    """Calculates how many steps are needed for the whole system to return its original position.
+def _half_periods(positions: np.ndarray) -> List[int]:
+    """Periods of the axes of a system that starts at rest, from the first return to zero velocities.
 
-    Note that all axes are completely independent, e.g., x-axis does not depend on y or z.
-    Their loops can be calculated independently.
+    Stepping is reversible: with R(x, v) = (x - v, -v), which is its own inverse, a step F satisfies R F R = F^-1.
+    The states fixed by R are those with zero velocities. An orbit through two of them, at step 0 and at step h,
+    is symmetric about both and repeats after 2h steps. If the positions at h equal the initial ones, the state
+    itself has repeated and the period is h, which happens when the period is odd.
+
+    Arguments:
+        positions: Initial positions, (N, 3) or one column per independent axis.
+
+    Returns:
+        The period of each axis.
     """
-    xs = np.zeros(len(moons))
-    ys = np.zeros(len(moons))
-    zs = np.zeros(len(moons))
-    for i, moon in enumerate(moons):
-        xs[i] = moon.position.x
-        ys[i] = moon.position.y
-        zs[i] = moon.position.z
-    x_steps = _calculate_loop_for_one_axis(xs)
-    y_steps = _calculate_loop_for_one_axis(ys)
-    z_steps = _calculate_loop_for_one_axis(zs)
-    return np.lcm.reduce([x_steps, y_steps, z_steps])
-
-
-def _calculate_loop_for_one_axis(positions: np.ndarray) -> int:
-    velocities = np.zeros(len(positions))
-    orig_positions = np.copy(positions)
+    initial = np.asarray(positions, dtype=np.int64).reshape(len(positions), -1)
+    positions = initial.copy()
+    velocities = np.zeros_like(positions)
+    periods = np.zeros(positions.shape[1], dtype=np.int64)
     steps = 0
-    while True:
-        for this, other in permutations(range(len(positions)), 2):
-            velocities[this] += _get_change(positions[this], positions[other])
-        for i, v in enumerate(velocities):
-            positions[i] += v
+    while not periods.all():
+        velocities += _gravity(positions)
+        positions += velocities
         steps += 1
-        if np.array_equal(positions, orig_positions) and all(velocities == 0):
-            break
-    return steps
+        if not velocities.all():
+            for axis in np.flatnonzero(~velocities.any(axis=0) & (periods == 0)):
+                repeated = np.array_equal(positions[:, axis], initial[:, axis])
+                periods[axis] = steps if repeated else 2 * steps
+    return periods.tolist()
+
+
+def find_cycle(positions: np.ndarray, velocities: np.ndarray) -> Tuple[int, int]:
+    """Finds the cycle that an arbitrary state runs into with Brent's algorithm.
+
+    Works for any state, including states with moving bodies and states from the middle of a run, and uses constant
+    memory: states are compared as bytes instead of being stored.
+
+    Arguments:
+        positions: Positions of the bodies, (N, 3) or one column per independent axis.
+        velocities: Velocities of the bodies, same shape as positions.
+
+    Returns:
+        The number of steps before the state enters the cycle, and the length of the cycle. Stepping is reversible,
+        so every state is on its cycle and the first is 0, but it is computed rather than assumed.
+    """
+    def advance(p: np.ndarray, v: np.ndarray, steps: int = 1):
+        for _ in range(steps):
+            v += _gravity(p)
+            p += v
+
+    def key(p: np.ndarray, v: np.ndarray) -> bytes:
+        return p.tobytes() + v.tobytes()
+
+    positions = np.array(positions, dtype=np.int64)
+    velocities = np.array(velocities, dtype=np.int64)
+    power = length = 1
+    tortoise = key(positions, velocities)
+    hare = positions.copy(), velocities.copy()
+    advance(*hare)
+    while tortoise != key(*hare):
+        if power == length:
+            tortoise = key(*hare)
+            power *= 2
+            length = 0
+        advance(*hare)
+        length += 1
+
+    # Find the start of the cycle by walking two states `length` steps apart
+    first = positions.copy(), velocities.copy()
+    second = positions.copy(), velocities.copy()
+    advance(*second, steps=length)
+    mu = 0
+    while key(*first) != key(*second):
+        advance(*first)
+        advance(*second)
+        mu += 1
+    return mu, length
+
+
+def _axis_period(args: Tuple[np.ndarray, np.ndarray, str]) -> int:
+    positions, velocities, method = args
+    if method == 'brent':
+        return find_cycle(positions[:, np.newaxis], velocities[:, np.newaxis])[1]
+    return _half_periods(positions[:, np.newaxis])[0]
+
+
+def calculate_loop(moons: List[Moon], workers: int = 1, method: str = 'half') -> int:
+    """Calculates how many steps are needed for the whole system to return its original position.
+
+    Note that all axes are completely independent, e.g., x-axis does not depend on y or z.
+    Their loops can be calculated independently, and the system repeats after the least common multiple of them.
+
+    Arguments:
+        moons: Moons at their initial state.
+        workers: With more than one worker, each axis is run in its own process.
+        method: 'half' finds the period of each axis from the first time its velocities are zero again, which is
+            half way round. It needs all velocities to be zero initially. 'brent' works for any state.
+
+    Returns:
+        Number of steps after which the system repeats.
+    """
+    system = MoonSystem.from_moons(moons)
+    if method not in ('half', 'brent'):
+        raise ValueError(f'Unknown cycle finding method {method}')
+    if method == 'half' and system.velocities.any():
+        raise ValueError('The half period method needs the moons to start at rest')
+    tasks = [(system.positions[:, axis], system.velocities[:, axis], method) for axis in range(3)]
+    if workers > 1:
+        with multiprocessing.Pool(min(workers, len(tasks))) as pool:
+            periods = pool.map(_axis_period, tasks)
+    elif method == 'half':
+        periods = _half_periods(system.positions)
+    else:
+        periods = [_axis_period(task) for task in tasks]
+    return int(np.lcm.reduce(periods))
 
 
 @click.command()
 @click.option('--input-file', required=True, type=str, default='inputs/input_day12.txt', show_default=True,
               help='Path to file containing moon positions.')
-def main(input_file):
-    moons = parse_input(input_file)
-    apply_gravity(moons, 1000)
-    print(f'Total energy: {calculate_total_energy(moons)}')
+@click.option('--workers', type=int, default=1, show_default=True,
+              help='Number of worker processes, one per axis, used to find the loop')
+@click.option('--energy-file', type=str, default=None,
+              help='Write the energy after every step to this .npy file')
+@click.option('--energy-steps', type=int, default=1000, show_default=True,
+              help='Number of steps written with --energy-file')
+def main(input_file, workers, energy_file, energy_steps):
+    system = MoonSystem.from_moons(parse_input(input_file))
+    system.step(1000)
+    print(f'Total energy: {system.total_energy()}')
+
+    if energy_file is not None:
+        system = MoonSystem.from_moons(parse_input(input_file))
+        trajectory = system.write_energy_trajectory(energy_file, energy_steps)
+        print(f'Energy of {len(trajectory)} steps written to {energy_file}, '
+              f'maximum total energy {trajectory["total"].max(initial=0)}')
 
     moons = parse_input(input_file)
-    loop_steps = calculate_loop(moons)
+    loop_steps = calculate_loop(moons, workers=workers)
     print(f'Steps needed for the system to repeat itself: {loop_steps}')
 
 
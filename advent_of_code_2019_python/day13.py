@@ -1,17 +1,20 @@
+import sys
 import time
+from typing import Callable, Dict, Iterable, Optional, Set, TextIO, Tuple
 
 import click
 import numpy as np  # type: ignore
 
 from advent_of_code_2019_python import IntcodeComputer
 
+ICONS = {1: '#',
+         2: 'X',
+         3: '_',
+         4: 'O'}
+
 
 def _array_formatter(x):
-    icons = {1: '#',
-             2: 'X',
-             3: '_',
-             4: 'O'}
-    return icons[x] if x in icons else '.'
+    return ICONS[x] if x in ICONS else '.'
 
 
 def _get_paddle_input(paddle_x, ball_x):
@@ -23,65 +26,178 @@ def _get_paddle_input(paddle_x, ball_x):
         return 0
 
 
-def play_game(intcode_computer: IntcodeComputer, screen: np.ndarray, show: bool = False):
-    # play for free by settings first intcode address to 2
-    intcode_computer.intcode[0] = 2
-    score = 0
-    paddle_x = 0
-    ball_x = 0
-    i = 0
-    tile_count = screen.shape[0] * screen.shape[1]
-
-    np.set_printoptions(formatter={'all': _array_formatter}, linewidth=100)
-
-    while not intcode_computer.halted:
-        x = intcode_computer.compute()
-        y = intcode_computer.compute()
-        output = intcode_computer.compute()
-        if x == -1 and y == 0:
-            score = output
-        else:
-            if x is not None and y is not None:
-                screen[y][x] = output
-                if output == 3:
-                    paddle_x = x
-                elif output == 4:
-                    ball_x = x
-                intcode_computer.set_inputs(_get_paddle_input(paddle_x, ball_x))
-        i += 1
-        if show:
-            # start drawing only when the screen is fully populated
-            if i > tile_count:
-                print(screen)
-                print(score)
-                time.sleep(0.05)
+def follow_ball(game: 'ArcadeGame') -> int:
+    """Paddle controller that moves the paddle towards the ball."""
+    return _get_paddle_input(game.paddle_x, game.ball_x)
+
+
+class TerminalRenderer:
+    """Draws the game on an ANSI terminal, redrawing only the tiles that changed."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        self.stream = stream if stream is not None else sys.stdout
+        self._cleared = False
+
+    def render(self, game: 'ArcadeGame', dirty: Iterable[Tuple[int, int]]):
+        parts = []
+        if not self._cleared:
+            parts.append('\x1b[2J')
+            self._cleared = True
+        for x, y in dirty:
+            # Rows below the score line, terminal coordinates are 1-based
+            parts.append(f'\x1b[{y + 2};{x + 1}H{_array_formatter(game.tiles[(x, y)])}')
+        parts.append(f'\x1b[1;1HScore: {game.score}\x1b[K')
+        self.stream.write(''.join(parts))
+        self.stream.flush()
+
+    def finish(self, game: 'ArcadeGame'):
+        """Move the cursor below the screen."""
+        max_y = max((y for _, y in game.tiles), default=0)
+        self.stream.write(f'\x1b[{max_y + 3};1H')
+        self.stream.flush()
+
+
+class ArcadeGame:
+    """Arcade cabinet running the day 13 game.
+
+    Every frame, the program draws the tiles that changed and then waits for the joystick. The engine consumes the
+    outputs of a frame in one batch, keeps the screen in `tiles` and the tiles changed since the last render in
+    `dirty`. With a renderer, run() plays at most `max_fps` frames per second, sleeping for the rest of each frame
+    interval, and draws every frame with the tiles that changed; without one the game runs headless as fast as the
+    program goes.
+
+    The joystick is moved by the controller, a function from the game to the joystick input (-1, 0 or 1).
+    """
+
+    def __init__(self, intcode_computer: IntcodeComputer, controller: Callable[['ArcadeGame'], int] = follow_ball,
+                 renderer: Optional[TerminalRenderer] = None, max_fps: float = 20):
+        self.intcode_computer = intcode_computer
+        self.controller = controller
+        self.renderer = renderer
+        self.max_fps = max_fps
+        self.tiles: Dict[Tuple[int, int], int] = {}
+        self.dirty: Set[Tuple[int, int]] = set()
+        self.score = 0
+        self.paddle_x = 0
+        self.ball_x = 0
+        self.frames = 0
+        self.elapsed = 0.0
+        self.instructions = 0
+        self._last_render = -float('inf')
+        self._next_frame = -float('inf')
+
+    def insert_coins(self):
+        """Play for free by setting the first intcode address to 2."""
+        self.intcode_computer.intcode[0] = 2
+
+    def frame(self):
+        """Run the program until it waits for the joystick and apply the tiles it drew."""
+        outputs = self.intcode_computer.run_until_input()
+        tiles = self.tiles
+        dirty = self.dirty
+        for x, y, tile in zip(outputs[0::3], outputs[1::3], outputs[2::3]):
+            if x == -1 and y == 0:
+                self.score = tile
+                continue
+            if tiles.get((x, y)) != tile:
+                tiles[(x, y)] = tile
+                dirty.add((x, y))
+            if tile == 3:
+                self.paddle_x = x
+            elif tile == 4:
+                self.ball_x = x
+        self.frames += 1
+
+    def wait_for_frame(self):
+        """Sleep until a frame interval has passed since the previous frame started."""
+        now = time.perf_counter()
+        if now < self._next_frame:
+            time.sleep(self._next_frame - now)
+            now = self._next_frame
+        self._next_frame = now + 1 / self.max_fps
+
+    def render(self, force: bool = False):
+        """Draw the changed tiles, unless the previous draw was less than a frame interval ago."""
+        if self.renderer is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_render >= 1 / self.max_fps:
+            self.renderer.render(self, sorted(self.dirty))
+            self.dirty.clear()
+            self._last_render = now
+
+    def run(self) -> int:
+        """Play until the program halts.
+
+        Returns:
+            The final score.
+        """
+        intcode_computer = self.intcode_computer
+        start = time.perf_counter()
+        start_instructions = intcode_computer.instruction_count
+        while not intcode_computer.halted:
+            if self.renderer is not None:
+                self.wait_for_frame()
+            self.frame()
+            # Frames are already paced, so every frame is drawn
+            self.render(force=True)
+            if not intcode_computer.halted:
+                intcode_computer.add_inputs(self.controller(self))
+        if self.renderer is not None:
+            self.renderer.finish(self)
+        self.elapsed += time.perf_counter() - start
+        self.instructions += intcode_computer.instruction_count - start_instructions
+        return self.score
+
+    def block_count(self) -> int:
+        return list(self.tiles.values()).count(2)
+
+    @property
+    def frames_per_second(self) -> float:
+        return self.frames / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def instructions_per_second(self) -> float:
+        return self.instructions / self.elapsed if self.elapsed else 0.0
+
+
+def play_game(intcode_computer: IntcodeComputer, screen: np.ndarray, show: bool = False, max_fps: float = 20) -> int:
+    """Play the game with the ball following controller.
+
+    Arguments:
+        intcode_computer: Computer loaded with the game.
+        screen: Array indexed by [y][x] that receives the final tiles.
+        show: Draw the game in the terminal while playing.
+        max_fps: Maximum number of draws per second when showing the game.
+
+    Returns:
+        The final score.
+    """
+    game = ArcadeGame(intcode_computer, renderer=TerminalRenderer() if show else None, max_fps=max_fps)
+    game.insert_coins()
+    score = game.run()
+    for (x, y), tile in game.tiles.items():
+        screen[y][x] = tile
     return score
 
 
 @click.command()
 @click.option('--input-file', required=True, type=str, default='inputs/input_day13.txt', show_default=True,
               help='Path to file containing Intcode program (comma-separated list)')
-def main(input_file):
-    intcode_computer = IntcodeComputer.from_file(input_file)
-    tiles = {}
-    while not intcode_computer.halted:
-        x = intcode_computer.compute()
-        y = intcode_computer.compute()
-        tile = intcode_computer.compute()
-        if x is not None and y is not None:
-            tiles[(x, y)] = tile
-    print(f' Number of block tiles on the screen: {list(tiles.values()).count(2)}')
-
-    # Get screen size
-    max_x, max_y = 0, 0
-    for x, y in tiles:
-        if x > max_x:
-            max_x = x
-        if y > max_y:
-            max_y = y
-
-    score = play_game(IntcodeComputer.from_file(input_file), np.zeros((max_y + 1, max_x + 1), dtype=np.int8))
+@click.option('--show', is_flag=True, help='Draw the game in the terminal')
+@click.option('--fps', type=float, default=20, show_default=True, help='Maximum frames drawn per second with --show')
+def main(input_file, show, fps):
+    game = ArcadeGame(IntcodeComputer.from_file(input_file))
+    game.frame()
+    print(f' Number of block tiles on the screen: {game.block_count()}')
+
+    game = ArcadeGame(IntcodeComputer.from_file(input_file), renderer=TerminalRenderer() if show else None,
+                      max_fps=fps)
+    game.insert_coins()
+    score = game.run()
     print(f'Score: {score}')
+    print(f'{game.frames} frames, {game.frames_per_second:.0f} frames/s, '
+          f'{game.instructions_per_second:.0f} instructions/s')
 
 
 if __name__ == '__main__':
@@ -1,8 +1,6 @@
-from collections import defaultdict
-from typing import Dict, Tuple, DefaultDict
+from typing import Dict, List, Tuple
 
 import click
-import numpy as np  # type: ignore
 
 
 def _parse_name_and_quantity(string: str) -> Tuple[str, int]:
@@ -27,57 +25,137 @@ def parse_file(input_file: str) -> Dict[str, Tuple[Dict[str, int], int]]:
     return reactions
 
 
+class ReactionGraph:
+    """Reactions compiled for repeated ore queries.
+
+    Chemicals are sorted topologically once, so that every chemical comes after all chemicals whose reactions
+    consume it. The required amounts can then be computed in one pass in that order: when a chemical is reached,
+    all demand for it is known, and its reactions are run just enough times to cover it. Amounts are integers
+    throughout and reaction counts use exact ceiling division, so any fuel amount is exact.
+    """
+
+    def __init__(self, reactions: Dict[str, Tuple[Dict[str, int], int]], product: str = 'FUEL', source: str = 'ORE'):
+        self.order = self._sort(reactions, product, source)
+        index = {chemical: i for i, chemical in enumerate(self.order)}
+        self._product = index[product]
+        self._source = index[source]
+        # Output quantity and (input index, input quantity) pairs of the reaction of each chemical, in order
+        self._reactions: List[Tuple[int, int, List[Tuple[int, int]]]] = [
+            (index[chemical], reactions[chemical][1],
+             [(index[name], quantity) for name, quantity in reactions[chemical][0].items()])
+            for chemical in self.order if chemical != source]
+
+    @staticmethod
+    def _sort(reactions: Dict[str, Tuple[Dict[str, int], int]], product: str, source: str) -> List[str]:
+        """Chemicals needed for the product, each one after all chemicals that consume it."""
+        postorder: List[str] = []
+        state: Dict[str, bool] = {}
+
+        def visit(chemical: str):
+            # False while the chemical is being visited, True once it is done
+            if chemical in state:
+                if not state[chemical]:
+                    raise ValueError(f'Reactions have a cycle through {chemical}')
+                return
+            state[chemical] = False
+            if chemical != source:
+                if chemical not in reactions:
+                    raise ValueError(f'No reaction produces {chemical}')
+                for ingredient in reactions[chemical][0]:
+                    visit(ingredient)
+            state[chemical] = True
+            postorder.append(chemical)
+
+        visit(product)
+        if source not in state:
+            raise ValueError(f'{product} does not need {source}')
+        return postorder[::-1]
+
+    def ore_for_fuel(self, fuel_amount: int = 1) -> int:
+        """Ore needed to produce an amount of fuel."""
+        needed = [0] * len(self.order)
+        needed[self._product] = fuel_amount
+        for chemical, produced_quantity, ingredients in self._reactions:
+            quantity = needed[chemical]
+            if quantity <= 0:
+                continue
+            reactions = -(-quantity // produced_quantity)
+            for ingredient, ingredient_quantity in ingredients:
+                needed[ingredient] += reactions * ingredient_quantity
+        return needed[self._source]
+
+
 def calculate_ore(reactions: Dict[str, Tuple[Dict[str, int], int]], fuel_amount: int = 1) -> int:
-    """Calculates needed total ore for one unit of FUEL.
+    """Calculates needed total ore for an amount of FUEL.
 
-    This is done by first calculating needed quantities of basic ingredients
-    (ingredients that only need ore) and then calculating total ore after that.
+    Reuse a ReactionGraph instead when asking for many fuel amounts.
     """
-    basic_ingredients: DefaultDict[str, int] = defaultdict(int)
-    leftovers: DefaultDict[str, int] = defaultdict(int)
-    _calculate_basic_ingredients(reactions, 'FUEL', fuel_amount, basic_ingredients, leftovers)
-    needed_ore = 0
-    for basic_ingredient in basic_ingredients:
-        needed_basic_ingredient = basic_ingredients[basic_ingredient]
-        basic_ingredient_produced_per_reaction = reactions[basic_ingredient][1]
-        consumed_ore_per_reaction = reactions[basic_ingredient][0]['ORE']
-        needed_reactions = int(np.ceil(float(needed_basic_ingredient) / float(basic_ingredient_produced_per_reaction)))
-        needed_ore += needed_reactions * consumed_ore_per_reaction
-    return needed_ore
-
-
-def _calculate_basic_ingredients(reactions: Dict[str, Tuple[Dict[str, int], int]], ingredient: str,
-                                 needed_quantity: int, basic_ingredients: Dict[str, int], leftovers: Dict[str, int]):
-    """Calculates needed basic ingredients while keeping track and using any leftovers from previous reactions."""
-    sub_ingredients, produced_quantity = reactions[ingredient]
-    if 'ORE' in sub_ingredients:
-        basic_ingredients[ingredient] += needed_quantity
-        return
-    # Consume leftovers
-    consumed_leftovers = min(needed_quantity, leftovers[ingredient])
-    needed_quantity -= consumed_leftovers
-    leftovers[ingredient] -= consumed_leftovers
-    # Save any extra to leftovers
-    needed_reactions = int(np.ceil(float(needed_quantity) / float(produced_quantity)))
-    total_produced_quantity = needed_reactions * produced_quantity
-    leftovers[ingredient] += total_produced_quantity - needed_quantity
-    for sub_ingredient in sub_ingredients:
-        needed_sub_ingredient_per_reaction = sub_ingredients[sub_ingredient]
-        needed_sub_ingredient_quantity = needed_reactions * needed_sub_ingredient_per_reaction
-        _calculate_basic_ingredients(reactions, sub_ingredient, needed_sub_ingredient_quantity, basic_ingredients,
-                                     leftovers)
+    return ReactionGraph(reactions).ore_for_fuel(fuel_amount)
+
+
+def max_fuel_for_ore(reactions: Dict[str, Tuple[Dict[str, int], int]], ore_budget: int) -> int:
+    """Finds the largest amount of FUEL that can be produced with the given amount of ore.
+
+    Ore needed grows monotonically with fuel and almost linearly, so the search starts from the budget divided by
+    the ore for one fuel, which is always affordable. It then interpolates with the ore-per-fuel ratio at that
+    amount, gallops upwards with doubling steps until the fuel is no longer affordable, and finishes with a binary
+    search. Ore queries run on one ReactionGraph and are memoized, so the answer takes O(log n) queries.
+
+    Arguments:
+        reactions: Reactions from parse_file.
+        ore_budget: Amount of ore available.
+
+    Returns:
+        The largest amount of FUEL whose ore need is at most the budget, 0 if not even one FUEL can be produced.
+
+    Raises:
+        ValueError: If FUEL can be produced without ore, so there is no largest amount.
+    """
+    graph = ReactionGraph(reactions)
+    ore_needed: Dict[int, int] = {}
+
+    def ore(fuel: int) -> int:
+        if fuel not in ore_needed:
+            ore_needed[fuel] = graph.ore_for_fuel(fuel)
+        return ore_needed[fuel]
+
+    def affordable(fuel: int) -> bool:
+        return ore(fuel) <= ore_budget
+
+    if not affordable(1):
+        return 0
+    if ore(1) == 0:
+        raise ValueError('FUEL needs no ore, any amount can be produced')
+    low = ore_budget // ore(1)
+    estimate = ore_budget * low // ore(low)
+    if estimate > low and affordable(estimate):
+        low = estimate
+    # Gallop until an unaffordable amount is found, then search between the last two amounts
+    step = 1
+    while affordable(low + step):
+        low += step
+        step *= 2
+    high = low + step
+    while high - low > 1:
+        middle = (low + high) // 2
+        if affordable(middle):
+            low = middle
+        else:
+            high = middle
+    return low
 
 
 @click.command()
 @click.option('--input-file', required=True, type=str, default='inputs/input_day14.txt', show_default=True,
               help='Path to file containing Intcode program (comma-separated list)')
-def main(input_file):
+@click.option('--ore-budget', type=int, default=10 ** 12, show_default=True,
+              help='Amount of ore available for producing FUEL in part 2')
+def main(input_file, ore_budget):
     reactions = parse_file(input_file)
     print(f'Part 1 (needed ore for one FUEL: {calculate_ore(reactions)}')
 
-    # NOTE: The value below obtained by simple (manual) search, do it programmatically
-    fuel = 3126714
-    print(f'Part 2: FUEL produced with 1 trillion ore: {calculate_ore(reactions, fuel)}')
+    fuel = max_fuel_for_ore(reactions, ore_budget)
+    print(f'Part 2: FUEL produced with {ore_budget} ore: {fuel} (needs {calculate_ore(reactions, fuel)} ore)')
 
 
 if __name__ == '__main__':
@@ -1,49 +1,62 @@
-from typing import List, Tuple
+from typing import List, Sequence, Tuple, Union
 
 import click
 import numpy as np  # type: ignore
 
 from advent_of_code_2019_python.intcode_computer import IntcodeComputer
+from advent_of_code_2019_python.scaffold_path import FUNCTION_NAMES, collect_dust, compress, trace_scaffold
+
+SCAFFOLD = ord('#')
+NEWLINE = ord('\n')
+
+
+def parse_camera(output: Union[bytes, Sequence[int], np.ndarray]) -> np.ndarray:
+    """Parses ASCII camera output into a uint8 array with a row per line.
+
+    The newline positions are found in one pass over the buffer and the buffer is reshaped into rows without copying
+    values one at a time. Empty lines at the end are ignored.
+
+    Raises:
+        ValueError: If the lines are not all the same length.
+    """
+    if isinstance(output, (bytes, bytearray)):
+        buffer = np.frombuffer(output, dtype=np.uint8)
+    else:
+        buffer = np.asarray(output, dtype=np.uint8)
+    end = len(buffer)
+    while end and buffer[end - 1] == NEWLINE:
+        end -= 1
+    if not end:
+        return np.zeros((0, 0), dtype=np.uint8)
+    newlines = np.flatnonzero(buffer[:end] == NEWLINE)
+    width = int(newlines[0]) if len(newlines) else end
+    # Every line, including the last one that lost its newline, takes width + 1 bytes
+    if (end + 1) % (width + 1) or np.any(newlines != np.arange(width, end, width + 1)):
+        raise ValueError('Camera output lines are not all the same length')
+    lines = np.empty(end + 1, dtype=np.uint8)
+    lines[:end] = buffer[:end]
+    lines[end] = NEWLINE
+    return lines.reshape(-1, width + 1)[:, :width]
 
 
 def populate_array(intcode_computer: IntcodeComputer) -> np.ndarray:
-    array: List[List[int]] = []
-    i = 0
-    array.append([])
-    output = intcode_computer.compute()
-    while not intcode_computer.halted:
-        if output == 10:
-            array.append([])
-            i += 1
-        else:
-            array[i].append(output)
-        output = intcode_computer.compute()
-    # The program outputs a couple of empty lines at the end, let's clear the resulting empty lists
-    while not array[-1]:
-        array.pop()
-    return np.array(array)
+    """Runs the camera program and returns the view as a uint8 array of ASCII codes."""
+    return parse_camera(intcode_computer.run_until_input())
 
 
 def get_intersections(array: np.ndarray) -> List[Tuple[int, int]]:
-    intersections = []
-    rows, cols = array.shape
-    for i in range(rows):
-        for j in range(cols):
-            if _is_intersection((i, j), array):
-                intersections.append((i, j))
-    return intersections
-
-
-def _is_intersection(location: Tuple, array: np.ndarray) -> bool:
-    row, col = location
-    surrounding_locations = [(row, col - 1), (row, col + 1), (row + 1, col), (row - 1, col)]
-    try:
-        for n, m in surrounding_locations:
-            if not array[n][m] == 35:
-                return False
-    except IndexError:
-        return False
-    return True
+    """Finds the scaffold cells that have scaffold on all four sides.
+
+    Cells on the border have no neighbour on one side, so they are never intersections.
+
+    Returns:
+        (row, column) of each intersection, in row-major order.
+    """
+    scaffold = array == SCAFFOLD
+    intersections = np.zeros_like(scaffold)
+    intersections[1:-1, 1:-1] = (scaffold[1:-1, 1:-1] & scaffold[:-2, 1:-1] & scaffold[2:, 1:-1]
+                                 & scaffold[1:-1, :-2] & scaffold[1:-1, 2:])
+    return [(row, col) for row, col in np.argwhere(intersections).tolist()]
 
 
 @click.command()
@@ -61,6 +74,17 @@ def main(input_file):
     sum_of_alignment_params = sum([i[0] * i[1] for i in intersections])
     print(f'Sum of alignment parameters: {sum_of_alignment_params}')
 
+    routine = compress(trace_scaffold(scaffolds_array))
+    if routine is None:
+        print('The scaffold path does not fit in the movement functions')
+        return
+    main_routine, functions = routine
+    print(f'Main routine: {",".join(FUNCTION_NAMES[i] for i in main_routine)}')
+    for name, function in zip(FUNCTION_NAMES, functions):
+        print(f'{name}: {",".join(f"{turn},{steps}" for turn, steps in function)}')
+    dust = collect_dust(IntcodeComputer.from_file(input_file), main_routine, functions)
+    print(f'Dust collected: {dust}')
+
 
 if __name__ == '__main__':
     main()
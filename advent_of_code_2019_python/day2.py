@@ -1,41 +1,125 @@
-import copy
-from typing import Optional, Tuple
+import multiprocessing
+from typing import Any, NamedTuple, Optional, Sequence, Tuple
 
 import click
+import numpy as np  # type: ignore
 
 from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python import process_pool
+from advent_of_code_2019_python.batch_intcode import BatchIntcodeComputer
+from advent_of_code_2019_python.intcode_symbolic import evaluate_symbolically, solve
 
 EXPECTED_OUTPUT = 19690720
 
 
-def find_noun_verb(orig_computer: IntcodeComputer, expected_output: int) -> Optional[Tuple[int, int]]:
+def _try_noun(computer: IntcodeComputer, expected_output: int, noun: int, verbs: Sequence[int]) -> Optional[int]:
+    """Returns the first verb that produces the expected output with given noun, or None."""
+    for verb in verbs:
+        intcode_computer = computer.fork()
+        intcode_computer.intcode[1] = noun
+        intcode_computer.intcode[2] = verb
+        intcode_computer.compute()
+        if intcode_computer.intcode[0] == expected_output:
+            return verb
+    return None
+
+
+class _NounSearch(NamedTuple):
+    """What a worker process needs to search nouns. The best noun index is shared by all workers."""
+    computer: IntcodeComputer
+    expected_output: int
+    verbs: Sequence[int]
+    best_noun_index: Any
+
+
+def _search_noun(search: _NounSearch, task: Tuple[int, int]) -> Optional[Tuple[int, int, int]]:
+    """Searches one noun. Skips the noun if a match has already been found with an earlier noun."""
+    noun_index, noun = task
+    best_noun_index = search.best_noun_index
+    if noun_index > best_noun_index.value:
+        return None
+    verb = _try_noun(search.computer, search.expected_output, noun, search.verbs)
+    if verb is None:
+        return None
+    with best_noun_index.get_lock():
+        best_noun_index.value = min(best_noun_index.value, noun_index)
+    return noun_index, noun, verb
+
+
+def _find_noun_verb_batched(orig_computer: IntcodeComputer, expected_output: int, nouns: Sequence[int],
+                            verbs: Sequence[int]) -> Optional[Tuple[int, int]]:
+    """Runs every noun and verb candidate as one lock-step batch and returns the first match in search order."""
+    candidates = np.array([(noun, verb) for noun in nouns for verb in verbs], dtype=np.int64).reshape(-1, 2)
+    batch = BatchIntcodeComputer(orig_computer.intcode_aslist, len(candidates))
+    batch.memory[:, 1:3] = candidates
+    batch.run()
+    matches = np.flatnonzero(batch.memory[:, 0] == expected_output)
+    return (int(candidates[matches[0], 0]), int(candidates[matches[0], 1])) if len(matches) else None
+
+
+def find_noun_verb(orig_computer: IntcodeComputer, expected_output: int, nouns: Sequence[int] = range(100),
+                   verbs: Sequence[int] = range(100), workers: int = 1, symbolic: bool = True,
+                   batched: bool = False) -> Optional[Tuple[int, int]]:
     """Finds integers at intcode indices 1 and 2 that produce the expected output
     on a given intcode program.
 
+    Straight-line add/multiply programs are first evaluated symbolically, and the resulting expression for index 0
+    is solved directly. Candidates from the solver are confirmed with a single run. Other programs fall back to
+    running every candidate.
+
+    With `batched`, brute force runs all candidates in lock-step with BatchIntcodeComputer, which needs the
+    program values to fit in int64. With more than one worker the nouns are spread across a process pool. Once a
+    match is found, workers stop searching nouns that come after it, and the result is the same as with a serial
+    search.
+
     Arguments:
         orig_computer: Intcode computer loaded with the desired intcode program.
         expected_output: The expected output integer that should be stored at index 0
             after executing the program.
+        nouns: Candidate values for index 1, searched in order.
+        verbs: Candidate values for index 2, searched in order for each noun.
+        workers: Number of worker processes.
+        symbolic: Attempt to solve the program symbolically before falling back to brute force.
+        batched: Brute force with a single vectorized batch instead of one run per candidate.
 
     Returns:
         Integers for positions 1 and 2 that produce the expected output.
     """
-    max_value = 99
-    for noun in range(max_value + 1):
-        for verb in range(max_value + 1):
-            intcode_computer = copy.deepcopy(orig_computer)
-            intcode_computer.intcode[1] = noun
-            intcode_computer.intcode[2] = verb
-            intcode_computer.compute()
-            if intcode_computer.intcode[0] == expected_output:
-                return intcode_computer.intcode[1], intcode_computer.intcode[2]
-    return None
+    expression = None
+    if symbolic and orig_computer.instr_pointer == 0 and not orig_computer.halted:
+        expression = evaluate_symbolically(orig_computer.intcode_aslist)
+    if expression is not None:
+        for noun, verb in solve(expression, expected_output, nouns, verbs):
+            if _try_noun(orig_computer, expected_output, noun, [verb]) is not None:
+                return noun, verb
+        return None
+
+    if batched:
+        return _find_noun_verb_batched(orig_computer, expected_output, nouns, verbs)
+    if workers <= 1:
+        for noun in nouns:
+            verb = _try_noun(orig_computer, expected_output, noun, verbs)
+            if verb is not None:
+                return noun, verb
+        return None
+
+    best_noun_index = multiprocessing.Value('q', len(nouns))
+    best = None
+    for result in process_pool.imap(_search_noun, enumerate(nouns), workers, _NounSearch, orig_computer,
+                                    expected_output, verbs, best_noun_index, ordered=False):
+        if result is not None and (best is None or result[0] < best[0]):
+            best = result
+    return (best[1], best[2]) if best is not None else None
 
 
 @click.command()
 @click.option('--input-file', required=True, type=str, default='inputs/input_day2.txt', show_default=True,
               help='Path to file containing Intcode program (comma-separated list)')
-def main(input_file):
+@click.option('--brute-force', is_flag=True,
+              help='Run every noun and verb candidate instead of solving the program symbolically')
+@click.option('--workers', type=int, default=1, show_default=True,
+              help='Number of worker processes used in the brute-force noun and verb search')
+def main(input_file, brute_force, workers):
     intcode_computer = IntcodeComputer.from_file(input_file)
     # Return the program to the 1202 program alarm state and get result
     intcode_computer.intcode[1] = 12
@@ -44,7 +128,8 @@ def main(input_file):
     print(f'Program output at index 0: {intcode_computer.intcode[0]}')
 
     # Find inputs in positions 1 and 2 that produce the expected output
-    noun, verb = find_noun_verb(IntcodeComputer.from_file(input_file), EXPECTED_OUTPUT)
+    noun, verb = find_noun_verb(IntcodeComputer.from_file(input_file), EXPECTED_OUTPUT, workers=workers,
+                                symbolic=not brute_force)
     print(f'Pair of inputs that produce output {EXPECTED_OUTPUT}: {noun} and {verb}')
 
 
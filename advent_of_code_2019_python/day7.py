@@ -1,10 +1,126 @@
-import copy
+import asyncio
 from itertools import permutations
-from typing import Optional
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
 
 import click
+import numpy as np  # type: ignore
 
-from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python import IntcodeComputer, process_pool
+from advent_of_code_2019_python.batch_intcode import BatchIntcodeComputer
+from advent_of_code_2019_python.async_intcode import AsyncIntcodeComputer, connect, ring, run_network
+
+
+class PhaseSearch:
+    """Depth-first search for the phase settings of serially connected amplifiers that give the maximum signal.
+
+    Every amplifier runs the same program, so its output only depends on its phase setting and input signal, and is
+    computed once per (phase, signal) pair. The best completion of a partial chain only depends on the phases used
+    so far, the number of amplifiers left and the signal coming out of the chain. It is memoized by those in a trie
+    whose nodes are the sets of used phases. Permutations that share a prefix share all work up to its end, and
+    prefixes that are permutations of each other and produce the same signal share the whole subtree.
+
+    The caches are kept between searches, so one instance can be searched repeatedly, for example with different
+    numbers of amplifiers.
+    """
+
+    def __init__(self, intcode_computer: IntcodeComputer, phases: Sequence[int] = range(5)):
+        self.intcode_computer = intcode_computer
+        self.phases = tuple(phases)
+        self.amplifier_runs = 0
+        self._outputs: Dict[Tuple[int, int], int] = {}
+        self._best: Dict[Tuple[FrozenSet[int], int, int], Tuple[int, Tuple[int, ...]]] = {}
+
+    def amplify(self, phase: int, signal: int) -> int:
+        """Output of one amplifier with the given phase setting and input signal."""
+        key = (phase, signal)
+        if key not in self._outputs:
+            amplifier = self.intcode_computer.fork()
+            amplifier.add_inputs(phase, signal)
+            output = amplifier.compute()
+            if output is None:
+                raise ValueError(f'Amplifier with phase setting {phase} and input {signal} gave no output')
+            self._outputs[key] = output
+            self.amplifier_runs += 1
+        return self._outputs[key]
+
+    def search(self, amplifiers: int, signal: int = 0,
+               used: FrozenSet[int] = frozenset()) -> Optional[Tuple[int, Tuple[int, ...]]]:
+        """Finds the best phase settings for a number of amplifiers after the already used phases.
+
+        Returns:
+            The maximum final signal and the phase settings of the remaining amplifiers, or None if there are not
+            enough unused phases.
+        """
+        if amplifiers == 0:
+            return signal, ()
+        key = (used, amplifiers, signal)
+        if key not in self._best:
+            best = None
+            for phase in self.phases:
+                if phase in used:
+                    continue
+                result = self.search(amplifiers - 1, self.amplify(phase, signal), used | {phase})
+                if result is not None and (best is None or result[0] > best[0]):
+                    best = result[0], (phase,) + result[1]
+            self._best[key] = best
+        return self._best[key]
+
+
+def _phase_search(intcode_computer: IntcodeComputer, phases: Sequence[int],
+                  amplifiers: int) -> Tuple[PhaseSearch, int]:
+    return PhaseSearch(intcode_computer, phases), amplifiers
+
+
+def _search_subtree(search: Tuple[PhaseSearch, int], first_phase: int) -> Optional[Tuple[int, Tuple[int, ...]]]:
+    """Searches the subtree of phase settings that start with the given phase, with the worker's PhaseSearch."""
+    phase_search, amplifiers = search
+    result = phase_search.search(amplifiers - 1, phase_search.amplify(first_phase, 0), frozenset([first_phase]))
+    return (result[0], (first_phase,) + result[1]) if result is not None else None
+
+
+def find_best_phase_settings(intcode_computer: IntcodeComputer, phases: Sequence[int] = range(5),
+                             amplifiers: Optional[int] = None,
+                             workers: int = 1) -> Optional[Tuple[int, Tuple[int, ...]]]:
+    """Finds the phase settings of serially connected amplifiers that give the maximum thruster signal.
+
+    With more than one worker, the subtrees of each first phase setting are searched in a process pool, each
+    worker with its own caches.
+
+    Arguments:
+        intcode_computer: Intcode computer loaded with the correct program.
+        phases: Phase settings to choose from, each used at most once.
+        amplifiers: Number of amplifiers, by default one per phase setting.
+        workers: Number of worker processes.
+
+    Returns:
+        The maximum signal and the phase settings that give it, or None if there are more amplifiers than phases.
+    """
+    amplifiers = len(phases) if amplifiers is None else amplifiers
+    if amplifiers == 0 or workers <= 1:
+        return PhaseSearch(intcode_computer, phases).search(amplifiers)
+    best = None
+    # Results come in phase order, so ties go to the first permutation like in the serial search
+    for result in process_pool.imap(_search_subtree, phases, workers, _phase_search, intcode_computer, tuple(phases),
+                                    amplifiers):
+        if result is not None and (best is None or result[0] > best[0]):
+            best = result
+    return best
+
+
+async def _run_feedback_loop(intcode_computer: IntcodeComputer, phase_settings: Sequence[int]) -> int:
+    """Runs amplifiers connected in a ring and returns the last output of the final amplifier."""
+    amplifiers = [AsyncIntcodeComputer(intcode_computer.fork()) for _ in phase_settings]
+    connect(amplifiers, ring(len(amplifiers)))
+    for amplifier, phase_setting in zip(amplifiers, phase_settings):
+        amplifier.send(phase_setting)
+    amplifiers[0].send(0)
+    await run_network(amplifiers)
+    return amplifiers[-1].outputs[-1]
+
+
+async def _run_feedback_loops(intcode_computer: IntcodeComputer) -> List[int]:
+    return await asyncio.gather(*(_run_feedback_loop(intcode_computer, permutation)
+                                  for permutation in permutations(range(5, 10))))
 
 
 def calculate_max_thruster_signal_feedback(intcode_computer: IntcodeComputer) -> Optional[int]:
@@ -12,8 +128,8 @@ def calculate_max_thruster_signal_feedback(intcode_computer: IntcodeComputer) ->
     Calculates maximum thruster signal that can be obtained with some combination of amplifier phase settings
     using a feedback loop.
 
-    The computer will keep computing without stopping until waiting for input, or they just output something. When the
-    final amplifier halts, the program is done and the last output is the thruster signal.
+    Amplifiers are connected in a ring and run on an asyncio event loop until all of them halt. The last output
+    of the final amplifier is the thruster signal.
 
     Like the non-feedback version, different permutation of phase settings are attempted and maximum thruster signal
     is returned.
@@ -24,64 +140,59 @@ def calculate_max_thruster_signal_feedback(intcode_computer: IntcodeComputer) ->
     Returns:
         Maximum amplified thruster signal.
     """
-    max_thruster_signal = None
-    for permutation in permutations(range(5, 10)):
-        # Initialize all computers
-        computers = []
-        output = 0
-        for phase_setting in permutation:
-            new_computer = copy.deepcopy(intcode_computer)
-            new_computer.set_inputs(phase_setting, output)
-            output = new_computer.compute()
-            computers.append(new_computer)
-        # Continue the feedback loop until halt
-        halted = False
-        while True:
-            if halted:
-                final_thruster_signal = output
-                break
-            for computer in computers:
-                computer.set_inputs(output)
-                temp_output = computer.compute()
-                if temp_output is not None:
-                    output = temp_output
-                if computer.halted:
-                    halted = True
-                    break
-        if max_thruster_signal is None or final_thruster_signal > max_thruster_signal:
-            max_thruster_signal = final_thruster_signal
-    return max_thruster_signal
-
-
-def calculate_max_thruster_signal(intcode_computer: IntcodeComputer) -> Optional[int]:
+    return max(asyncio.run(_run_feedback_loops(intcode_computer)), default=None)
+
+
+def _calculate_max_thruster_signal_batched(intcode_computer: IntcodeComputer, phases: Sequence[int],
+                                           amplifiers: int) -> Optional[int]:
+    """Runs all permutations together: each amplifier stage is one batch with an instance per permutation, whose
+    inputs are the phase setting and the output of the previous stage.
+    """
+    phase_settings = np.array(list(permutations(phases, amplifiers)), dtype=np.int64).reshape(-1, amplifiers)
+    signals = np.zeros(len(phase_settings), dtype=np.int64)
+    for stage in range(amplifiers):
+        batch = BatchIntcodeComputer(intcode_computer.intcode_aslist, len(phase_settings),
+                                     inputs=np.column_stack([phase_settings[:, stage], signals]))
+        batch.run()
+        signals = np.array([outputs[0] for outputs in batch.outputs], dtype=np.int64)
+    return int(signals.max()) if len(signals) else None
+
+
+def calculate_max_thruster_signal(intcode_computer: IntcodeComputer, phases: Sequence[int] = range(5),
+                                  amplifiers: Optional[int] = None, workers: int = 1,
+                                  batched: bool = False) -> Optional[int]:
     """
     Calculates max thruster signal using connected intcode computers with some permutations of phase setting.
 
+    Permutations are searched with PhaseSearch, which runs each amplifier once per distinct phase setting and input
+    signal. With `batched`, every permutation is instead run in full with BatchIntcodeComputer, one lock-step batch
+    per amplifier stage.
+
     Arguments:
         intcode_computer: Intcode computer loaded with the correct program.
+        phases: Phase settings to choose from.
+        amplifiers: Number of amplifiers, by default one per phase setting.
+        workers: Number of worker processes searching the permutations.
+        batched: Run all permutations as lock-step batches.
 
     Returns:
         Maximum signal that can be obtained with some permutation of phase settings.
     """
-    max_thruster_signal = None
-    for permutation in permutations(range(5)):
-        output = 0
-        for phase_setting in permutation:
-            new_computer = copy.deepcopy(intcode_computer)
-            new_computer.set_inputs(phase_setting, output)
-            output = new_computer.compute()
-        final_thruster_signal = output
-        if max_thruster_signal is None or final_thruster_signal > max_thruster_signal:
-            max_thruster_signal = final_thruster_signal
-    return max_thruster_signal
+    amplifiers = len(phases) if amplifiers is None else amplifiers
+    if batched:
+        return _calculate_max_thruster_signal_batched(intcode_computer, phases, amplifiers)
+    best = find_best_phase_settings(intcode_computer, phases, amplifiers, workers)
+    return best[0] if best is not None else None
 
 
 @click.command()
 @click.option('--input-file', required=True, type=str, default='inputs/input_day7.txt', show_default=True,
               help='Path to file containing Intcode program (comma-separated list)')
-def main(input_file):
+@click.option('--workers', type=int, default=1, show_default=True,
+              help='Number of worker processes used in the phase setting search')
+def main(input_file, workers):
     intcode_computer = IntcodeComputer.from_file(input_file)
-    max_thruster_signal = calculate_max_thruster_signal(intcode_computer)
+    max_thruster_signal = calculate_max_thruster_signal(intcode_computer, workers=workers)
     print(max_thruster_signal)
 
     intcode_computer = IntcodeComputer.from_file(input_file)
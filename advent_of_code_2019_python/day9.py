@@ -4,10 +4,8 @@ from advent_of_code_2019_python import IntcodeComputer
 
 
 def print_outputs(intcode_computer: IntcodeComputer):
-    while not intcode_computer.halted:
-        output = intcode_computer.compute()
-        if output is not None:
-            print(output)
+    for output in intcode_computer.outputs():
+        print(output)
 
 
 @click.command()
@@ -0,0 +1,102 @@
+from typing import Optional, Tuple
+
+import numpy as np  # type: ignore
+
+
+class GrowableGrid:
+    """Dense 2-D grid of values addressed by (x, y) coordinates that may be negative.
+
+    Values are kept in a NumPy array covering a bounding box of the grid. Writing outside the box grows it in that
+    direction, at least doubling its size along the axis, so writes are amortized O(1) and reads are O(1). Cells that
+    have never been written read as `default`. Which cells have been written at least once is tracked in a boolean
+    bitmap of the same shape.
+
+    get() and set() take the coordinates as separate ints, so loops that walk the grid do not need to create
+    coordinate tuples.
+    """
+
+    def __init__(self, dtype=np.int8, default: int = 0, initial_size: int = 16):
+        self.default = default
+        self.values = np.full((initial_size, initial_size), default, dtype=dtype)
+        self.written = np.zeros((initial_size, initial_size), dtype=bool)
+        # Coordinates of values[0, 0]; the initial box is centered on the origin
+        self.min_x = -(initial_size // 2)
+        self.min_y = -(initial_size // 2)
+        self.written_count = 0
+
+    def __len__(self) -> int:
+        """Number of cells written at least once."""
+        return self.written_count
+
+    def __getitem__(self, position: Tuple[int, int]) -> int:
+        return self.get(*position)
+
+    def __setitem__(self, position: Tuple[int, int], value: int):
+        self.set(*position, value)
+
+    def get(self, x: int, y: int) -> int:
+        row = y - self.min_y
+        col = x - self.min_x
+        height, width = self.values.shape
+        if 0 <= row < height and 0 <= col < width:
+            return int(self.values[row, col])
+        return self.default
+
+    def set(self, x: int, y: int, value: int):
+        row = y - self.min_y
+        col = x - self.min_x
+        height, width = self.values.shape
+        if not (0 <= row < height and 0 <= col < width):
+            self._grow(x, y)
+            row = y - self.min_y
+            col = x - self.min_x
+        self.values[row, col] = value
+        if not self.written[row, col]:
+            self.written[row, col] = True
+            self.written_count += 1
+
+    def _grow(self, x: int, y: int):
+        """Reallocate the arrays so that the box includes (x, y), doubling the size along each axis that grows."""
+        height, width = self.values.shape
+        max_x = self.min_x + width - 1
+        max_y = self.min_y + height - 1
+        new_min_x = min(x, self.min_x - width) if x < self.min_x else self.min_x
+        new_max_x = max(x, max_x + width) if x > max_x else max_x
+        new_min_y = min(y, self.min_y - height) if y < self.min_y else self.min_y
+        new_max_y = max(y, max_y + height) if y > max_y else max_y
+        shape = (new_max_y - new_min_y + 1, new_max_x - new_min_x + 1)
+        values = np.full(shape, self.default, dtype=self.values.dtype)
+        written = np.zeros(shape, dtype=bool)
+        row = self.min_y - new_min_y
+        col = self.min_x - new_min_x
+        values[row:row + height, col:col + width] = self.values
+        written[row:row + height, col:col + width] = self.written
+        self.values = values
+        self.written = written
+        self.min_x = new_min_x
+        self.min_y = new_min_y
+
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """The (min x, min y, max x, max y) of the written cells, or None if nothing has been written."""
+        rows = np.flatnonzero(self.written.any(axis=1))
+        cols = np.flatnonzero(self.written.any(axis=0))
+        if not len(rows):
+            return None
+        return (self.min_x + int(cols[0]), self.min_y + int(rows[0]),
+                self.min_x + int(cols[-1]), self.min_y + int(rows[-1]))
+
+    def to_array(self, y_up: bool = False) -> np.ndarray:
+        """The smallest array holding all written cells, indexed by [row][column].
+
+        Arguments:
+            y_up: If True, y grows upwards so the first row is the largest y. Otherwise the first row is the smallest y.
+
+        Returns:
+            A copy of the values in the bounding box of the written cells.
+        """
+        bounds = self.bounds()
+        if bounds is None:
+            return np.zeros((0, 0), dtype=self.values.dtype)
+        min_x, min_y, max_x, max_y = bounds
+        array = self.values[min_y - self.min_y:max_y - self.min_y + 1, min_x - self.min_x:max_x - self.min_x + 1]
+        return array[::-1].copy() if y_up else array.copy()
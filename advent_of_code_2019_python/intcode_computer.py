@@ -1,22 +1,24 @@
+import os
+import struct
+import sys
+import time
+import zlib
 from abc import ABC, abstractmethod
-from collections import defaultdict
-from typing import DefaultDict, List, Optional
+from collections import deque
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
 
 import attr
 
-
-def _list_to_defaultdict(l: List[int]) -> DefaultDict[int, int]:
-    d: DefaultDict[int, int] = defaultdict(int)
-    for i, x in enumerate(l):
-        d[i] = x
-    return d
+from advent_of_code_2019_python.intcode_jit import JIT_THRESHOLD, compile_block
+from advent_of_code_2019_python.intcode_memory import IntcodeMemory
+from advent_of_code_2019_python.intcode_profiler import IntcodeProfiler
 
 
 @attr.s(auto_attribs=True)
 class IntcodeOperation(ABC):
-    intcode: DefaultDict[int, int]
+    intcode: IntcodeMemory
     instr_pointer: int
-    inputs: List[int]
+    inputs: Deque[int]
     relative_base: int
     param_modes: int = attr.ib(init=False)
     halted: bool = attr.ib(init=False, default=False)
@@ -85,9 +87,9 @@ class MultiplyOperation(IntcodeOperation):
 
 
 class InputOperation(IntcodeOperation):
-    """Consume the next input. Inputs can be anything that support pop()."""
+    """Consume the next input. Inputs can be anything that support popleft()."""
     def execute(self):
-        self.output_to_index(self.inputs.pop())
+        self.output_to_index(self.inputs.popleft())
         self.instr_pointer += 1
 
 
@@ -153,49 +155,496 @@ OPERATIONS = {1: AddOperation,
               9: AdjustRelativeBaseOperation,
               99: HaltOperation}
 
+PARAMETER_COUNTS = {1: 3, 2: 3, 3: 1, 4: 1, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1}
+
+
+def _decode(instruction: int) -> Tuple[int, int, int, int, int]:
+    """Decode an instruction into opcode, parameter count and the three parameter modes."""
+    opcode = instruction % 100
+    return (opcode, PARAMETER_COUNTS.get(opcode, 0),
+            instruction // 100 % 10, instruction // 1000 % 10, instruction // 10000 % 10)
+
+
+class InputRequired(Exception):
+    """Raised when the program executes an input instruction and no input is available.
+
+    The computer is left at the input instruction, so computing can continue once inputs are added.
+    """
+
+
+class ExecutionLimitExceeded(Exception):
+    """Raised when the instruction budget or the deadline of a computer is exceeded.
+
+    The computer is left before the next instruction, so computing can continue after the limits are raised.
+    """
+    def __init__(self, message: str, reason: str):
+        super().__init__(message)
+        # 'instructions' or 'deadline'
+        self.reason = reason
+
+
+# How many instructions are executed between checks of the wall-clock deadline
+DEADLINE_CHECK_INTERVAL = 10000
+
+CHECKPOINT_MAGIC = b'ICCP'
+CHECKPOINT_VERSION = 1
+_CHECKPOINT_HEADER = struct.Struct('<4sH')
+
+
+def _to_memory(intcode: Iterable[int]) -> IntcodeMemory:
+    if isinstance(intcode, IntcodeMemory):
+        return intcode.fork()
+    return IntcodeMemory(intcode)
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class IntcodeSnapshot:
+    """Saved state of an IntcodeComputer. The memory is a copy-on-write fork and is never written to."""
+    intcode: IntcodeMemory
+    inputs: Tuple[int, ...]
+    instr_pointer: int
+    relative_base: int
+    halted: bool
+    instruction_count: int
+
+    def to_bytes(self) -> bytes:
+        """Encode the snapshot as two Intcode images: the computer state with pending inputs, and the memory."""
+        from advent_of_code_2019_python.intcode_image import encode_image
+        state = [self.instr_pointer, self.relative_base, self.instruction_count, int(self.halted), len(self.inputs)]
+        return encode_image(state + list(self.inputs)) + encode_image(self.intcode.cells)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, offset: int = 0) -> Tuple['IntcodeSnapshot', int]:
+        """Decode a snapshot encoded with to_bytes() starting at an offset.
+
+        Returns:
+            The snapshot and the offset right after it.
+        """
+        from advent_of_code_2019_python.intcode_image import decode_image
+        state, offset = decode_image(data, offset)
+        cells, offset = decode_image(data, offset)
+        instr_pointer, relative_base, instruction_count, halted, _ = state[:5]
+        return cls(IntcodeMemory(cells), tuple(state[5:]), instr_pointer, relative_base, bool(halted),
+                   instruction_count), offset
+
 
 @attr.s
 class IntcodeComputer:
-    intcode: DefaultDict[int, int] = attr.ib(converter=_list_to_defaultdict)
-    inputs: List[int] = attr.ib(init=False, factory=list)
+    """Intcode interpreter.
+
+    With `jit` enabled, execution is tiered: basic blocks that are jumped to often are compiled into Python functions
+    (see intcode_jit) and run instead of being interpreted, until the program modifies them.
+
+    With a `profiler`, every executed instruction is recorded (see intcode_profiler). Profiling disables the JIT.
+
+    Long runs can be limited with set_limits() and checkpointed periodically with enable_checkpoints().
+    """
+    intcode: IntcodeMemory = attr.ib(converter=_to_memory)
+    jit: bool = attr.ib(default=False, kw_only=True)
+    profiler: Optional[IntcodeProfiler] = attr.ib(default=None, kw_only=True)
+    inputs: Deque[int] = attr.ib(init=False, factory=deque)
+    input_callback: Optional[Callable[[], Optional[int]]] = attr.ib(init=False, default=None)
+    # Iterables given to feed(), read one value at a time when the program needs an input
+    input_iterators: Deque[Iterator[int]] = attr.ib(init=False, factory=deque, repr=False)
     instr_pointer: int = attr.ib(init=False, default=0)
     relative_base: int = attr.ib(init=False, default=0)
     halted: bool = attr.ib(init=False, default=False)
+    instruction_count: int = attr.ib(init=False, default=0)
+    decode_hits: int = attr.ib(init=False, default=0)
+    decode_misses: int = attr.ib(init=False, default=0)
+    instruction_limit: Optional[int] = attr.ib(init=False, default=None)
+    deadline: Optional[float] = attr.ib(init=False, default=None)
+    checkpoint_file: Optional[str] = attr.ib(init=False, default=None)
+    checkpoint_interval: Optional[int] = attr.ib(init=False, default=None)
+    _next_checkpoint: int = attr.ib(init=False, default=sys.maxsize, repr=False)
+    # Number of times each jump target has been reached, used to find hot blocks
+    _jit_heat: Dict[int, int] = attr.ib(init=False, factory=dict, repr=False)
 
     @classmethod
-    def from_file(cls, filename: str):
+    def from_file(cls, filename: str, **kwargs):
+        """Load a program from a comma-separated text file or from a binary image (see intcode_image).
+
+        Memory loaded from an image stays memory-mapped until the program is run or written to.
+        """
+        # Imported here so that the image converter can be run as a module without importing itself twice
+        from advent_of_code_2019_python.intcode_image import is_image, map_memory
+        if is_image(filename):
+            return cls(map_memory(filename), **kwargs)
         with open(filename) as f:
             intcode = f.read().rstrip('\n').split(',')
-        return cls([int(x) for x in intcode])
+        return cls([int(x) for x in intcode], **kwargs)
 
-    def compute(self):
-        """Computes an intcode program result.
+    def compute(self) -> Optional[int]:
+        """Computes an intcode program result until the next output.
+
+        Inputs are consumed from `inputs` first, then read from the iterables given to feed() and then requested from
+        `input_callback`, if one is set. If none provides a value, InputRequired is raised and the computer stays at
+        the input instruction.
+
+        Returns:
+            The next output value, or None if the program halted.
+        """
+        return self._execute(None)
+
+    def run_until_input(self) -> List[int]:
+        """Computes until the program halts or needs an input that is not available.
+
+        Returns:
+            All outputs produced on the way, in one batch.
+        """
+        outputs: List[int] = []
+        try:
+            self._execute(outputs)
+        except InputRequired:
+            pass
+        return outputs
+
+    def outputs(self) -> Iterator[int]:
+        """Generates output values until the program halts or needs an input that is not available."""
+        try:
+            while True:
+                output = self._execute(None)
+                if output is None:
+                    return
+                yield output
+        except InputRequired:
+            return
+
+    def _execute(self, outputs: Optional[List[int]]) -> Optional[int]:
+        """The interpreter loop.
+
+        Operations are dispatched directly on the opcode and parameter modes are decoded in place, so no objects are
+        allocated per instruction. Interpreter state is kept in local variables while running and written back to the
+        computer when the loop exits.
+
+        Arguments:
+            outputs: If None, return at the first output. Otherwise outputs are appended to it and computing
+                continues until halt or missing input.
+
+        Returns:
+            The output value when returning at an output, otherwise None.
+        """
+        memory = self.intcode
+        # The loop writes to the cell list directly, so take ownership of shared memory first
+        memory.own()
+        cells = memory.cells
+        size = len(cells)
+        inputs = self.inputs
+        input_iterators = self.input_iterators
+        input_callback = self.input_callback
+        ip = self.instr_pointer
+        relative_base = self.relative_base
+        count = self.instruction_count
+        decoded = memory.decoded
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.resume()
+        # Compiled blocks would run past an exact instruction budget
+        jit = self.jit and profiler is None and self.instruction_limit is None
+        check_at = self._next_check(count)
+        blocks = memory.blocks
+        code = memory.code
+        invalidate = memory.invalidate_code
+        heat = self._jit_heat
+        hits = self.decode_hits
+        misses = self.decode_misses
+        a = b = c = 0
+        try:
+            while True:
+                if count >= check_at:
+                    self.instr_pointer = ip
+                    self.relative_base = relative_base
+                    self.instruction_count = count
+                    check_at = self._check_limits()
+                entry = decoded.get(ip)
+                if entry is None:
+                    misses += 1
+                    entry = decoded[ip] = _decode(cells[ip] if ip < size else 0)
+                else:
+                    hits += 1
+                opcode, param_count, mode_a, mode_b, mode_c = entry
+                if opcode == 99:
+                    self.halted = True
+                    return None
+                count += 1
+                # Resolve parameter addresses, immediate mode points to the parameter itself
+                if mode_a == 1:
+                    a = ip + 1
+                else:
+                    a = cells[ip + 1] if ip + 1 < size else 0
+                    if mode_a == 2:
+                        a += relative_base
+                    if a < 0:
+                        raise IndexError(f'Negative memory address {a}')
+                if param_count > 1:
+                    if mode_b == 1:
+                        b = ip + 2
+                    else:
+                        b = cells[ip + 2] if ip + 2 < size else 0
+                        if mode_b == 2:
+                            b += relative_base
+                        if b < 0:
+                            raise IndexError(f'Negative memory address {b}')
+                    if param_count > 2:
+                        if mode_c == 1:
+                            c = ip + 3
+                        else:
+                            c = cells[ip + 3] if ip + 3 < size else 0
+                            if mode_c == 2:
+                                c += relative_base
+                            if c < 0:
+                                raise IndexError(f'Negative memory address {c}')
+                        if c >= size:
+                            memory.grow(c)
+                            size = len(cells)
+                        # Self-modifying code: drop the decoded instruction at the written address
+                        if c in decoded:
+                            del decoded[c]
+                        if c in code:
+                            invalidate(c)
+                if profiler is not None and opcode != 3:
+                    profiler.record(cells, ip, opcode, a, b, c)
+
+                if opcode == 1:
+                    cells[c] = (cells[a] if a < size else 0) + (cells[b] if b < size else 0)
+                    ip += 4
+                elif opcode == 2:
+                    cells[c] = (cells[a] if a < size else 0) * (cells[b] if b < size else 0)
+                    ip += 4
+                elif opcode == 3:
+                    if inputs:
+                        value = inputs.popleft()
+                    else:
+                        if profiler is not None:
+                            profiler.wait_for_input()
+                        # Fed iterables and the callback see the computer at this input instruction
+                        self.instr_pointer = ip
+                        self.relative_base = relative_base
+                        self.instruction_count = count - 1
+                        value = self._next_fed_input() if input_iterators else None
+                        if value is None and input_callback is not None:
+                            value = input_callback()
+                        if value is None:
+                            count -= 1
+                            raise InputRequired(f'No input available at address {ip}')
+                        if profiler is not None:
+                            profiler.resume()
+                        if memory.shared:
+                            # The input source forked this computer, stop writing to the shared cells
+                            memory.own()
+                            cells = memory.cells
+                            decoded = memory.decoded
+                            blocks = memory.blocks
+                            code = memory.code
+                    if profiler is not None:
+                        profiler.record(cells, ip, opcode, a, b, c)
+                    if a >= size:
+                        memory.grow(a)
+                        size = len(cells)
+                    if a in decoded:
+                        del decoded[a]
+                    if a in code:
+                        invalidate(a)
+                    cells[a] = value
+                    ip += 2
+                elif opcode == 4:
+                    ip += 2
+                    value = cells[a] if a < size else 0
+                    if outputs is None:
+                        return value
+                    outputs.append(value)
+                elif opcode == 5 or opcode == 6:
+                    if ((cells[a] if a < size else 0) != 0) == (opcode == 5):
+                        ip = cells[b] if b < size else 0
+                    else:
+                        ip += 3
+                    if jit:
+                        # Jump targets start basic blocks: run compiled ones and count how hot the others are
+                        block = blocks.get(ip)
+                        # Blocks run back to back, return to the interpreter loop when limits are due a check
+                        while block is not None and count < check_at:
+                            ip, relative_base, executed = block[1](cells, relative_base, decoded, code, invalidate)
+                            count += executed
+                            block = blocks.get(ip)
+                        size = len(cells)
+                        reached = heat.get(ip, 0) + 1
+                        if reached >= JIT_THRESHOLD:
+                            reached = 0
+                            compiled = compile_block(cells, ip)
+                            if compiled is not None:
+                                memory.add_block(ip, *compiled)
+                        heat[ip] = reached
+                elif opcode == 7:
+                    cells[c] = 1 if (cells[a] if a < size else 0) < (cells[b] if b < size else 0) else 0
+                    ip += 4
+                elif opcode == 8:
+                    cells[c] = 1 if (cells[a] if a < size else 0) == (cells[b] if b < size else 0) else 0
+                    ip += 4
+                elif opcode == 9:
+                    relative_base += cells[a] if a < size else 0
+                    ip += 2
+                else:
+                    raise ValueError(f'Unknown opcode {opcode} at address {ip}')
+        finally:
+            self.instr_pointer = ip
+            self.relative_base = relative_base
+            self.instruction_count = count
+            self.decode_hits = hits
+            self.decode_misses = misses
+
+    def _next_check(self, count: int) -> int:
+        """The instruction count at which limits and checkpoints have to be checked next."""
+        check_at = self._next_checkpoint
+        if self.instruction_limit is not None:
+            check_at = min(check_at, self.instruction_limit)
+        if self.deadline is not None:
+            check_at = min(check_at, count + DEADLINE_CHECK_INTERVAL)
+        return check_at
+
+    def _check_limits(self) -> int:
+        """Write a checkpoint if one is due and raise if a limit is exceeded. Interpreter state must be up to date."""
+        count = self.instruction_count
+        if self.checkpoint_file is not None and count >= self._next_checkpoint:
+            self.save_checkpoint(self.checkpoint_file)
+            self._next_checkpoint = count + self.checkpoint_interval
+        if self.instruction_limit is not None and count >= self.instruction_limit:
+            raise ExecutionLimitExceeded(f'Instruction budget exhausted at {count} instructions', 'instructions')
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise ExecutionLimitExceeded(f'Deadline exceeded at {count} instructions', 'deadline')
+        return self._next_check(count)
+
+    def set_limits(self, instructions: Optional[int] = None, seconds: Optional[float] = None):
+        """Limit further computing to a number of instructions and/or seconds of wall-clock time from now.
+
+        When a limit is exceeded, ExecutionLimitExceeded is raised. Calling this again with new limits allows the
+        computation to continue. None removes a limit.
+        """
+        self.instruction_limit = self.instruction_count + instructions if instructions is not None else None
+        self.deadline = time.monotonic() + seconds if seconds is not None else None
+
+    def enable_checkpoints(self, filename: str, interval: int):
+        """Save a checkpoint to a file every `interval` instructions. The file is replaced atomically."""
+        self.checkpoint_file = filename
+        self.checkpoint_interval = interval
+        self._next_checkpoint = self.instruction_count + interval
+
+    def save_checkpoint(self, filename: str):
+        """Save the full state of the computer (memory, pointers and pending inputs) to a compressed file."""
+        payload = self.snapshot().to_bytes()
+        temporary = filename + '.tmp'
+        with open(temporary, 'wb') as f:
+            f.write(_CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION))
+            f.write(zlib.compress(payload))
+        os.replace(temporary, filename)
+
+    @classmethod
+    def load_checkpoint(cls, filename: str, **kwargs) -> 'IntcodeComputer':
+        """Create a computer from a checkpoint file, ready to continue computing."""
+        with open(filename, 'rb') as f:
+            magic, version = _CHECKPOINT_HEADER.unpack(f.read(_CHECKPOINT_HEADER.size))
+            if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+                raise ValueError(f'{filename} is not a supported Intcode checkpoint')
+            payload = zlib.decompress(f.read())
+        snapshot, _ = IntcodeSnapshot.from_bytes(payload)
+        computer = cls([], **kwargs)
+        computer.restore(snapshot)
+        return computer
+
+    def compute_reference(self) -> Optional[int]:
+        """Computes an intcode program result using the operation classes in OPERATIONS.
 
         First, the opcode is parsed and correct operation is selected based on that.
         A pointer to available inputs is provided to the operation, which it may optionally consume.
         The operation return an output value or None. If an output is returned, processing is paused.
         Instruction pointer and halt status are updated.
+
+        This is considerably slower than compute() and is kept as the reference the fast interpreter is verified
+        against.
         """
         output = None
         while not self.halted:
             # Parse opcode
             opcode = self.intcode[self.instr_pointer] % 100
+            if opcode == 3 and not self.inputs:
+                value = self._next_fed_input()
+                if value is not None:
+                    self.inputs.append(value)
             # Execute operation and get output
             operation = OPERATIONS[opcode](self.intcode, self.instr_pointer, self.inputs, self.relative_base)
             output = operation.execute()
+            if opcode != 99:
+                self.instruction_count += 1
             # Update variables after operation
             self.instr_pointer = operation.instr_pointer
             self.relative_base = operation.relative_base
             self.halted = operation.halted
             if output is not None:
                 return output
+        return None
 
     def set_inputs(self, *inputs):
-        """Set one or more inputs."""
-        self.inputs = [i for i in inputs]
-        # Internally stored as reversed list, popping from beginning is slow
-        self.inputs.reverse()
+        """Set one or more inputs, replacing any inputs not yet consumed."""
+        self.inputs = deque(inputs)
+        self.input_iterators.clear()
+
+    def add_inputs(self, *inputs):
+        """Queue one or more inputs after any inputs not yet consumed."""
+        self.inputs.extend(inputs)
+
+    def feed(self, inputs: Iterable[int]):
+        """Use the values of an iterable as inputs once the queued inputs run out.
+
+        The iterable is read lazily, one value each time the program needs an input, so it can be infinite or depend
+        on the state of the computer. Iterables fed earlier are read first. Values not yet read are not part of
+        snapshots and forks.
+        """
+        self.input_iterators.append(iter(inputs))
+
+    def _next_fed_input(self) -> Optional[int]:
+        """The next value of the fed iterables, or None if they are exhausted."""
+        input_iterators = self.input_iterators
+        while input_iterators:
+            value = next(input_iterators[0], None)
+            if value is not None:
+                return value
+            input_iterators.popleft()
+        return None
+
+    @property
+    def needs_input(self) -> bool:
+        """True if the next instruction is an input instruction and no queued input is available."""
+        return not self.halted and not self.inputs and self.intcode[self.instr_pointer] % 100 == 3
+
+    def fork(self) -> 'IntcodeComputer':
+        """Return an independent copy of this computer.
+
+        Memory is shared copy-on-write, so forking costs the same regardless of program size until either computer
+        writes to memory.
+        """
+        computer = IntcodeComputer(self.intcode)
+        computer.inputs = deque(self.inputs)
+        computer.input_callback = self.input_callback
+        computer.jit = self.jit
+        computer.instr_pointer = self.instr_pointer
+        computer.relative_base = self.relative_base
+        computer.halted = self.halted
+        computer.instruction_count = self.instruction_count
+        return computer
+
+    def snapshot(self) -> IntcodeSnapshot:
+        """Save the current state of the computer so it can be restored later."""
+        return IntcodeSnapshot(self.intcode.fork(), tuple(self.inputs), self.instr_pointer, self.relative_base,
+                               self.halted, self.instruction_count)
+
+    def restore(self, snapshot: IntcodeSnapshot):
+        """Return the computer to a previously saved state. The snapshot can be restored any number of times."""
+        self.intcode = snapshot.intcode.fork()
+        self.inputs = deque(snapshot.inputs)
+        self.instr_pointer = snapshot.instr_pointer
+        self.relative_base = snapshot.relative_base
+        self.halted = snapshot.halted
+        self.instruction_count = snapshot.instruction_count
 
     @property
-    def intcode_aslist(self):
-        return [x for x in self.intcode.values()]
+    def intcode_aslist(self) -> List[int]:
+        return self.intcode.tolist()
@@ -0,0 +1,139 @@
+import os
+import struct
+from typing import List, Sequence, Tuple
+
+import click
+import numpy as np  # type: ignore
+
+from advent_of_code_2019_python.intcode_memory import IntcodeMemory
+
+# Image layout, all little-endian:
+#   header: magic, format version, reserved, number of cells, number of overflow entries
+#   cells: one int64 per cell, 0 for cells that are in the overflow table
+#   overflow table: for each entry the cell index (uint64), byte length (uint32) and the value as signed bytes
+MAGIC = b'INTC'
+VERSION = 1
+_HEADER = struct.Struct('<4sHHQQ')
+_OVERFLOW_ENTRY = struct.Struct('<QI')
+_INT64_MIN = -2 ** 63
+_INT64_MAX = 2 ** 63 - 1
+
+IMAGE_SUFFIX = '.icim'
+
+
+def is_image(filename: str) -> bool:
+    """True if the file starts with the image magic bytes."""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def encode_image(intcode: Sequence[int]) -> bytes:
+    """Encode an Intcode program as image bytes. Values that do not fit in int64 go to the overflow table."""
+    overflow: List[Tuple[int, int]] = []
+    cells = np.zeros(len(intcode), dtype='<i8')
+    for i, value in enumerate(intcode):
+        if _INT64_MIN <= value <= _INT64_MAX:
+            cells[i] = value
+        else:
+            overflow.append((i, value))
+    parts = [_HEADER.pack(MAGIC, VERSION, 0, len(cells), len(overflow)), cells.tobytes()]
+    for i, value in overflow:
+        data = value.to_bytes((value.bit_length() + 8) // 8, 'little', signed=True)
+        parts += [_OVERFLOW_ENTRY.pack(i, len(data)), data]
+    return b''.join(parts)
+
+
+def decode_image(data: bytes, offset: int = 0) -> Tuple[List[int], int]:
+    """Decode image bytes starting at an offset.
+
+    Returns:
+        The cell values and the offset right after the image, where another image may follow.
+    """
+    magic, version, _, cell_count, overflow_count = _HEADER.unpack_from(data, offset)
+    if magic != MAGIC:
+        raise ValueError('Data is not an Intcode image')
+    if version != VERSION:
+        raise ValueError(f'Unsupported Intcode image version {version}')
+    offset += _HEADER.size
+    cells = np.frombuffer(data, dtype='<i8', count=cell_count, offset=offset).tolist()
+    offset += 8 * cell_count
+    for _ in range(overflow_count):
+        index, length = _OVERFLOW_ENTRY.unpack_from(data, offset)
+        offset += _OVERFLOW_ENTRY.size
+        cells[index] = int.from_bytes(data[offset:offset + length], 'little', signed=True)
+        offset += length
+    return cells, offset
+
+
+def write_image(intcode: Sequence[int], filename: str):
+    """Write an Intcode program as a binary image file."""
+    with open(filename, 'wb') as f:
+        f.write(encode_image(intcode))
+
+
+def _read_header(filename: str) -> Tuple[int, int]:
+    with open(filename, 'rb') as f:
+        magic, version, _, cell_count, overflow_count = _HEADER.unpack(f.read(_HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f'{filename} is not an Intcode image')
+    if version != VERSION:
+        raise ValueError(f'Unsupported Intcode image version {version}')
+    return cell_count, overflow_count
+
+
+def map_image(filename: str) -> np.ndarray:
+    """Map the int64 cells of an image read-only into memory.
+
+    The mapping is shared between processes that map the same file. Cells in the overflow table read as 0, use
+    load_image to get their values.
+    """
+    cell_count, _ = _read_header(filename)
+    if not cell_count:
+        return np.zeros(0, dtype='<i8')
+    return np.memmap(filename, dtype='<i8', mode='r', offset=_HEADER.size, shape=(cell_count,))
+
+
+def map_memory(filename: str) -> IntcodeMemory:
+    """Intcode memory backed by the read-only memory map of an image, until it is first written or run.
+
+    Images with values in the overflow table cannot be represented by the int64 map and are loaded into a list.
+    """
+    cell_count, overflow_count = _read_header(filename)
+    if overflow_count or not cell_count:
+        return IntcodeMemory(load_image(filename))
+    memory = IntcodeMemory()
+    memory.cells = map_image(filename)
+    return memory
+
+
+def load_image(filename: str) -> List[int]:
+    """Load an image as a list of cell values, including values from the overflow table."""
+    cell_count, overflow_count = _read_header(filename)
+    cells = map_image(filename).tolist()
+    if overflow_count:
+        with open(filename, 'rb') as f:
+            f.seek(_HEADER.size + 8 * cell_count)
+            for _ in range(overflow_count):
+                index, length = _OVERFLOW_ENTRY.unpack(f.read(_OVERFLOW_ENTRY.size))
+                cells[index] = int.from_bytes(f.read(length), 'little', signed=True)
+    return cells
+
+
+@click.command()
+@click.argument('input_files', nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False))
+@click.option('--output-dir', type=click.Path(file_okay=False), default=None,
+              help='Directory for the images, by default next to each input file')
+def main(input_files, output_dir):
+    """Convert comma-separated Intcode programs into binary images."""
+    for input_file in input_files:
+        with open(input_file) as f:
+            intcode = [int(x) for x in f.read().rstrip('\n').split(',')]
+        directory = output_dir if output_dir is not None else os.path.dirname(input_file)
+        os.makedirs(directory or '.', exist_ok=True)
+        output_file = os.path.join(directory, os.path.splitext(os.path.basename(input_file))[0] + IMAGE_SUFFIX)
+        write_image(intcode, output_file)
+        print(f'{input_file} -> {output_file} ({len(intcode)} cells)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+from typing import Callable, List, Optional, Tuple
+
+# Number of times a block start has to be reached before it is compiled
+JIT_THRESHOLD = 16
+# Maximum number of instructions in a compiled block
+MAX_BLOCK_LENGTH = 64
+
+# Opcodes that can be compiled into a block, 5 and 6 end the block
+_ARITHMETIC = {1: '{} + {}', 2: '{} * {}', 7: '1 if {} < {} else 0', 8: '1 if {} == {} else 0'}
+_PARAMETER_COUNTS = {1: 3, 2: 3, 5: 2, 6: 2, 7: 3, 8: 3, 9: 1}
+
+# Signature of a compiled block: (cells, relative base, decode cache, code map, invalidate) -> (ip, relative base,
+# number of executed instructions)
+Block = Callable[..., Tuple[int, int, int]]
+
+
+def _scan(cells: List[int], start: int) -> List[Tuple[int, int, List[int]]]:
+    """Returns the (address, instruction, parameter words) of the instructions in the basic block at start."""
+    instructions = []
+    ip = start
+    while len(instructions) < MAX_BLOCK_LENGTH and ip < len(cells):
+        instruction = cells[ip]
+        opcode = instruction % 100
+        if opcode not in _PARAMETER_COUNTS:
+            break
+        count = _PARAMETER_COUNTS[opcode]
+        words = [cells[ip + i] if ip + i < len(cells) else 0 for i in range(1, count + 1)]
+        instructions.append((ip, instruction, words))
+        ip += count + 1
+        if opcode in (5, 6):
+            break
+    return instructions
+
+
+def compile_block(cells: List[int], start: int) -> Optional[Tuple[int, Block]]:
+    """Compiles the basic block starting at an address into a Python function.
+
+    A block is a run of add, multiply, compare and relative base instructions, optionally ending with a jump.
+    Parameter modes and position and immediate parameters are resolved at compile time; relative mode addresses
+    are computed from the relative base at run time. Input, output and halt end the block before them, and are left to
+    the interpreter.
+
+    Every write checks whether it hit compiled code. Such writes invalidate the affected blocks, and a block that
+    writes into itself returns to the interpreter right after the write.
+
+    Returns:
+        The end address (exclusive) of the block and the compiled function, or None if there is nothing to compile.
+    """
+    instructions = _scan(cells, start)
+    if not instructions:
+        return None
+    last_address, last_instruction, last_words = instructions[-1]
+    end = last_address + len(last_words) + 1
+    length = len(cells)
+    lines = [f'def block_{start}(cells, rb, decoded, code, invalidate):']
+    temporaries = 0
+
+    def read(mode: int, word: int) -> Optional[str]:
+        nonlocal temporaries
+        if mode == 1:
+            return repr(word)
+        if mode == 0:
+            if word < 0:
+                return None
+            return f'cells[{word}]' if word < length else f'(cells[{word}] if {word} < len(cells) else 0)'
+        temporaries += 1
+        name = f't{temporaries}'
+        lines.append(f'    {name} = rb + {word}')
+        lines.append(f'    if {name} < 0: raise IndexError(f"Negative memory address {{{name}}}")')
+        return f'(cells[{name}] if {name} < len(cells) else 0)'
+
+    for executed, (address, instruction, words) in enumerate(instructions, start=1):
+        opcode = instruction % 100
+        modes = [instruction // 10 ** (i + 2) % 10 for i in range(len(words))]
+        operands = [read(mode, word) for mode, word in zip(modes[:2], words[:2])]
+        if None in operands:
+            return None
+        next_ip = address + len(words) + 1
+        if opcode == 9:
+            lines.append(f'    rb += {operands[0]}')
+        elif opcode == 5:
+            lines.append(f'    return ({operands[1]} if {operands[0]} else {next_ip}), rb, {executed}')
+        elif opcode == 6:
+            lines.append(f'    return ({next_ip} if {operands[0]} else {operands[1]}), rb, {executed}')
+        else:
+            value = _ARITHMETIC[opcode].format(*operands)
+            if modes[2] == 1 or modes[2] == 0:
+                target = address + 3 if modes[2] == 1 else words[2]
+                if target < 0:
+                    return None
+                lines.append(f'    value = {value}')
+                if target >= length:
+                    lines.append(f'    if {target} >= len(cells): cells.extend([0] * ({target} + 1 - len(cells)))')
+                lines.append(f'    cells[{target}] = value')
+                lines.append(f'    if {target} in decoded: del decoded[{target}]')
+                lines.append(f'    if {target} in code: invalidate({target})')
+                if start <= target < end:
+                    # Writes into this block, the rest of it is stale
+                    lines.append(f'    return {next_ip}, rb, {executed}')
+                    break
+            else:
+                lines.append(f'    value = {value}')
+                lines.append(f'    target = rb + {words[2]}')
+                lines.append('    if target < 0: raise IndexError(f"Negative memory address {target}")')
+                lines.append('    if target >= len(cells): cells.extend([0] * (target + 1 - len(cells)))')
+                lines.append('    cells[target] = value')
+                lines.append('    if target in decoded: del decoded[target]')
+                lines.append('    if target in code:')
+                lines.append('        invalidate(target)')
+                lines.append(f'        if {start} <= target < {end}: return {next_ip}, rb, {executed}')
+    else:
+        if last_instruction % 100 not in (5, 6):
+            lines.append(f'    return {end}, rb, {len(instructions)}')
+
+    namespace: dict = {}
+    exec(compile('\n'.join(lines), f'<intcode block {start}>', 'exec'), namespace)
+    return end, namespace[f'block_{start}']
@@ -0,0 +1,151 @@
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+
+class IntcodeMemory:
+    """Contiguous, growable Intcode memory.
+
+    Cells are stored in a plain list indexed by address, so values keep arbitrary precision. Cells that have never
+    been written read as zero, and writing past the end extends the memory with zeros up to the written address.
+    Negative addresses are invalid and raise an IndexError.
+
+    Decoded instructions are cached by address in `decoded`. The cache is filled by IntcodeComputer and any write
+    through this object drops the entry at the written address, so self-modifying code is always re-decoded.
+    Blocks compiled by the JIT are kept in `blocks` by start address together with their end address, and `code`
+    maps every address covered by a block to the starts of the blocks covering it. Writes to covered addresses
+    invalidate the blocks.
+
+    Forked memories share the cell list and the caches copy-on-write: fork() is O(1) regardless of program
+    size, and the first write to a shared memory copies it. Code that mutates `cells` directly must call own() first.
+
+    Memory loaded from a binary image (see intcode_image.map_memory) starts out `mapped`: `cells` is then the
+    read-only memory map of the image file, which processes mapping the same file share through the page cache. own()
+    turns it into a private list, so the first write or run of a computer copies the cells. A mapped memory is pickled
+    as the name of its image file, so process pools send the path to their workers instead of the cells.
+    """
+    __slots__ = ('cells', 'decoded', 'blocks', 'code', '_sharers')
+
+    def __init__(self, values: Iterable[int] = ()):
+        self.cells: List[int] = list(values)
+        self.decoded: Dict[int, Tuple[int, int, int, int, int]] = {}
+        self.blocks: Dict[int, Tuple[int, Callable]] = {}
+        self.code: Dict[int, Tuple[int, ...]] = {}
+        # Number of memories sharing `cells`, boxed in a list so all sharers see the same count
+        self._sharers = [1]
+
+    def __getitem__(self, address: int) -> int:
+        if address < 0:
+            raise IndexError(f'Negative memory address {address}')
+        cells = self.cells
+        return int(cells[address]) if address < len(cells) else 0
+
+    def __setitem__(self, address: int, value: int):
+        if address < 0:
+            raise IndexError(f'Negative memory address {address}')
+        self.own()
+        cells = self.cells
+        if address >= len(cells):
+            self.grow(address)
+        cells[address] = value
+        self.decoded.pop(address, None)
+        if address in self.code:
+            self.invalidate_code(address)
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.cells) if not self.mapped else iter(self.cells.tolist())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, IntcodeMemory):
+            return self.tolist() == other.tolist()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f'IntcodeMemory({self.tolist()!r})'
+
+    def __reduce__(self):
+        if self.mapped:
+            from advent_of_code_2019_python.intcode_image import map_memory
+            return map_memory, (self.cells.filename,)
+        return _from_list, (self.cells,)
+
+    def __copy__(self) -> 'IntcodeMemory':
+        return self.fork()
+
+    def __deepcopy__(self, memo) -> 'IntcodeMemory':
+        # Cells are immutable ints, so a copy-on-write fork behaves as a full copy
+        return self.fork()
+
+    @property
+    def shared(self) -> bool:
+        return self._sharers[0] > 1
+
+    @property
+    def mapped(self) -> bool:
+        """True if the cells are still the read-only memory map of an image file."""
+        return not isinstance(self.cells, list)
+
+    def own(self):
+        """Make sure this memory is the only owner of its cells, copying them if they are shared or mapped."""
+        sharers = self._sharers
+        if sharers[0] > 1:
+            sharers[0] -= 1
+            self.cells = self.cells[:] if not self.mapped else self.cells.tolist()
+            self.decoded = self.decoded.copy()
+            self.blocks = self.blocks.copy()
+            self.code = self.code.copy()
+            self._sharers = [1]
+        elif self.mapped:
+            self.cells = self.cells.tolist()
+
+    def grow(self, address: int):
+        """Extend memory with zeros so that the given address is valid."""
+        self.own()
+        cells = self.cells
+        if address >= len(cells):
+            cells.extend([0] * (address + 1 - len(cells)))
+
+    def add_block(self, start: int, end: int, block: Callable):
+        """Register a compiled block covering addresses from start to end (exclusive)."""
+        self.blocks[start] = (end, block)
+        code = self.code
+        for address in range(start, end):
+            code[address] = code.get(address, ()) + (start,)
+
+    def invalidate_code(self, address: int):
+        """Drop all compiled blocks covering the address."""
+        code = self.code
+        for start in code.get(address, ()):
+            end, _ = self.blocks.pop(start)
+            for covered in range(start, end):
+                remaining = tuple(s for s in code[covered] if s != start)
+                if remaining:
+                    code[covered] = remaining
+                else:
+                    del code[covered]
+
+    def fork(self) -> 'IntcodeMemory':
+        """Return a copy-on-write copy of this memory in constant time."""
+        memory = IntcodeMemory()
+        memory.cells = self.cells
+        memory.decoded = self.decoded
+        memory.blocks = self.blocks
+        memory.code = self.code
+        memory._sharers = self._sharers
+        self._sharers[0] += 1
+        return memory
+
+    def copy(self) -> 'IntcodeMemory':
+        """Return an eagerly copied memory."""
+        memory = IntcodeMemory()
+        memory.cells = self.tolist()
+        return memory
+
+    def tolist(self) -> List[int]:
+        return self.cells[:] if not self.mapped else self.cells.tolist()
+
+
+def _from_list(cells: List[int]) -> IntcodeMemory:
+    """Unpickle a memory that is not mapped. Caches are not pickled, compiled blocks cannot be."""
+    return IntcodeMemory(cells)
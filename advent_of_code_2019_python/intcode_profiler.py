@@ -0,0 +1,101 @@
+import json
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+OPCODE_NAMES = {1: 'add',
+                2: 'multiply',
+                3: 'input',
+                4: 'output',
+                5: 'jump_if_true',
+                6: 'jump_if_false',
+                7: 'less_than',
+                8: 'equals',
+                9: 'adjust_relative_base'}
+
+# Which of the resolved parameter addresses each opcode reads and writes
+_READS = {1: 2, 2: 2, 3: 0, 4: 1, 5: 2, 6: 2, 7: 2, 8: 2, 9: 1}
+_WRITES = {1: 2, 2: 2, 7: 2, 8: 2, 3: 0}
+
+
+class IntcodeProfiler:
+    """Collects execution statistics of an IntcodeComputer.
+
+    Attach an instance with `IntcodeComputer(..., profiler=IntcodeProfiler())`. Every executed instruction is
+    recorded by opcode and address, together with the memory addresses it reads and writes and the relative base
+    adjustments. Time spent waiting for input, either in the input callback or between running out of input and
+    computing again, is accumulated in `input_wait`. Compiled blocks are not used while profiling, so every instruction
+    is seen.
+
+    Instructions are also grouped by basic block, a block starting at each jump target, for the collapsed-stack output
+    that flamegraph tools read.
+    """
+
+    def __init__(self):
+        self.opcodes: Counter = Counter()
+        self.addresses: Counter = Counter()
+        self.reads: Counter = Counter()
+        self.writes: Counter = Counter()
+        self.relative_base_adjustments: Counter = Counter()
+        self.input_wait = 0.0
+        self._blocks: Counter = Counter()
+        self._block = 0
+        self._block_ends = True
+        self._waiting_since: Optional[float] = None
+
+    def record(self, cells: List[int], ip: int, opcode: int, a: int, b: int, c: int):
+        """Record an instruction about to be executed at ip with resolved parameter addresses a, b and c."""
+        self.opcodes[opcode] += 1
+        self.addresses[ip] += 1
+        if self._block_ends:
+            self._block = ip
+        self._block_ends = opcode == 5 or opcode == 6
+        self._blocks[(self._block, ip, opcode)] += 1
+        addresses = (a, b, c)
+        for address in addresses[:_READS.get(opcode, 0)]:
+            self.reads[address] += 1
+        if opcode in _WRITES:
+            self.writes[addresses[_WRITES[opcode]]] += 1
+        if opcode == 9:
+            self.relative_base_adjustments[cells[a] if a < len(cells) else 0] += 1
+
+    def wait_for_input(self):
+        """Mark that the computer stopped because it ran out of input."""
+        self._waiting_since = time.perf_counter()
+
+    def resume(self):
+        """Mark that the computer continues computing, ending any wait for input."""
+        if self._waiting_since is not None:
+            self.input_wait += time.perf_counter() - self._waiting_since
+            self._waiting_since = None
+
+    @property
+    def instruction_count(self) -> int:
+        return sum(self.opcodes.values())
+
+    def hot_addresses(self, n: int = 10) -> List[Tuple[int, int]]:
+        """The n most executed instruction addresses with their execution counts."""
+        return self.addresses.most_common(n)
+
+    def to_dict(self) -> Dict:
+        return {'instruction_count': self.instruction_count,
+                'opcodes': {OPCODE_NAMES.get(opcode, str(opcode)): count
+                            for opcode, count in sorted(self.opcodes.items())},
+                'addresses': dict(sorted(self.addresses.items())),
+                'reads': dict(sorted(self.reads.items())),
+                'writes': dict(sorted(self.writes.items())),
+                'relative_base_adjustments': dict(sorted(self.relative_base_adjustments.items())),
+                'input_wait_seconds': self.input_wait}
+
+    def write_json(self, filename: str):
+        with open(filename, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def collapsed_stacks(self) -> List[str]:
+        """Instruction counts as collapsed stacks (program;block;instruction count), one line per instruction."""
+        return [f'intcode;block@{block};{OPCODE_NAMES.get(opcode, opcode)}@{ip} {count}'
+                for (block, ip, opcode), count in sorted(self._blocks.items())]
+
+    def write_collapsed(self, filename: str):
+        with open(filename, 'w') as f:
+            f.write('\n'.join(self.collapsed_stacks()) + '\n')
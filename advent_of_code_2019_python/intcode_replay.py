@@ -0,0 +1,228 @@
+import struct
+import sys
+import zlib
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional
+
+import attr
+
+from advent_of_code_2019_python.intcode_computer import (ExecutionLimitExceeded, InputRequired, IntcodeComputer,
+                                                         IntcodeSnapshot)
+from advent_of_code_2019_python.intcode_memory import IntcodeMemory
+
+RECORDING_MAGIC = b'ICRC'
+RECORDING_VERSION = 1
+_RECORDING_HEADER = struct.Struct('<4sHI')
+
+INPUT = 'in'
+OUTPUT = 'out'
+_KINDS = (INPUT, OUTPUT)
+
+
+@attr.s(frozen=True, auto_attribs=True)
+class Event:
+    """An input consumed or an output produced by a recorded computer.
+
+    The timestamp is the number of instructions executed before the input or output instruction.
+    """
+    instruction_count: int
+    kind: str
+    value: int
+
+
+@attr.s(auto_attribs=True)
+class Recording:
+    """The I/O events of a recorded session, and snapshots of the computer taken during it.
+
+    Every snapshot is taken at an input instruction, before the input is consumed, and the first one at the start of
+    the session. Events are in the order they happened.
+    """
+    snapshots: List[IntcodeSnapshot] = attr.Factory(list)
+    events: List[Event] = attr.Factory(list)
+
+    @property
+    def instruction_count(self) -> int:
+        """Timestamp of the last event."""
+        return self.events[-1].instruction_count if self.events else 0
+
+    def inputs(self, since: int = 0) -> List[int]:
+        """Inputs consumed at or after an instruction count."""
+        return [event.value for event in self.events if event.kind == INPUT and event.instruction_count >= since]
+
+    def outputs(self, since: int = 0) -> List[int]:
+        """Outputs produced at or after an instruction count."""
+        return [event.value for event in self.events if event.kind == OUTPUT and event.instruction_count >= since]
+
+    def snapshot_before(self, instruction_count: int) -> IntcodeSnapshot:
+        """The latest snapshot taken at or before an instruction count."""
+        candidates = [s for s in self.snapshots if s.instruction_count <= instruction_count]
+        if not candidates:
+            raise ValueError(f'No snapshot at or before instruction {instruction_count}')
+        return candidates[-1]
+
+    def save(self, filename: str):
+        """Save the recording as a compressed file, using the same snapshot encoding as checkpoints."""
+        from advent_of_code_2019_python.intcode_image import encode_image
+        flat_events = []
+        for event in self.events:
+            flat_events += [event.instruction_count, _KINDS.index(event.kind), event.value]
+        payload = encode_image(flat_events) + b''.join(snapshot.to_bytes() for snapshot in self.snapshots)
+        with open(filename, 'wb') as f:
+            f.write(_RECORDING_HEADER.pack(RECORDING_MAGIC, RECORDING_VERSION, len(self.snapshots)))
+            f.write(zlib.compress(payload))
+
+    @classmethod
+    def load(cls, filename: str) -> 'Recording':
+        from advent_of_code_2019_python.intcode_image import decode_image
+        with open(filename, 'rb') as f:
+            magic, version, snapshot_count = _RECORDING_HEADER.unpack(f.read(_RECORDING_HEADER.size))
+            if magic != RECORDING_MAGIC or version != RECORDING_VERSION:
+                raise ValueError(f'{filename} is not a supported Intcode recording')
+            payload = zlib.decompress(f.read())
+        flat_events, offset = decode_image(payload)
+        events = [Event(flat_events[i], _KINDS[flat_events[i + 1]], flat_events[i + 2])
+                  for i in range(0, len(flat_events), 3)]
+        snapshots = []
+        for _ in range(snapshot_count):
+            snapshot, offset = IntcodeSnapshot.from_bytes(payload, offset)
+            snapshots.append(snapshot)
+        return cls(snapshots, events)
+
+
+class IntcodeRecorder:
+    """Records the I/O of an IntcodeComputer driven by an interactive controller.
+
+    The recorder has the parts of the computer interface that controllers use (`intcode`, `halted`,
+    `instruction_count`, add_inputs(), run_until_input() and compute()), so it can be passed to a controller such as
+    day13.play_game in place of the computer. Inputs are handed to the computer one at a time through its input
+    callback, so each input is logged with the instruction count at which the program consumed it, and outputs are
+    logged as they are produced.
+
+    A snapshot is taken at the first input after every `snapshot_interval` instructions. seek() starts from the
+    nearest of them instead of from the beginning.
+    """
+
+    def __init__(self, computer: IntcodeComputer, snapshot_interval: int = 100000):
+        self.computer = computer
+        self.snapshot_interval = snapshot_interval
+        self.recording = Recording()
+        # Inputs are given to the computer through the callback only, so that each one is timestamped
+        self._pending: Deque[int] = deque(computer.inputs)
+        computer.inputs.clear()
+        self._input_iterators: Deque[Iterator[int]] = deque(computer.input_iterators)
+        computer.input_iterators.clear()
+        computer.input_callback = self._next_input
+        self._next_snapshot = computer.instruction_count
+
+    @property
+    def intcode(self) -> IntcodeMemory:
+        return self.computer.intcode
+
+    @property
+    def halted(self) -> bool:
+        return self.computer.halted
+
+    @property
+    def instruction_count(self) -> int:
+        return self.computer.instruction_count
+
+    def add_inputs(self, *inputs):
+        """Queue one or more inputs after any inputs not yet consumed."""
+        self._pending.extend(inputs)
+
+    def compute(self) -> Optional[int]:
+        """Computes until the next output, like IntcodeComputer.compute()."""
+        computer = self.computer
+        if not self.recording.snapshots:
+            # Taken lazily, so changes the controller makes to memory before starting are part of the recording
+            self._take_snapshot()
+        output = computer.compute()
+        if output is not None:
+            # The output instruction is included in the count once it has executed
+            self.recording.events.append(Event(computer.instruction_count - 1, OUTPUT, output))
+        return output
+
+    def run_until_input(self) -> List[int]:
+        """Computes until the program halts or needs an input that is not available.
+
+        Returns:
+            All outputs produced on the way, in one batch.
+        """
+        outputs = []
+        try:
+            while True:
+                output = self.compute()
+                if output is None:
+                    break
+                outputs.append(output)
+        except InputRequired:
+            pass
+        return outputs
+
+    def _take_snapshot(self):
+        self.recording.snapshots.append(self.computer.snapshot())
+        self._next_snapshot = self.computer.instruction_count + self.snapshot_interval
+
+    def _next_input(self) -> Optional[int]:
+        while not self._pending and self._input_iterators:
+            value = next(self._input_iterators[0], None)
+            if value is None:
+                self._input_iterators.popleft()
+            else:
+                self._pending.append(value)
+        if not self._pending:
+            return None
+        if self.computer.instruction_count >= self._next_snapshot:
+            self._take_snapshot()
+        value = self._pending.popleft()
+        self.recording.events.append(Event(self.computer.instruction_count, INPUT, value))
+        return value
+
+
+def seek(recording: Recording, instruction_count: int, **kwargs) -> IntcodeComputer:
+    """Fast-forward to a point of a recorded session.
+
+    The computer is restored from the latest snapshot at or before the instruction count, given the recorded inputs
+    from there on, and run until exactly `instruction_count` instructions have been executed. The controller is not
+    needed, and only the instructions after the snapshot are executed.
+
+    Arguments:
+        recording: The recorded session.
+        instruction_count: Number of instructions executed when returning.
+        kwargs: Passed to IntcodeComputer, for example jit=True.
+
+    Returns:
+        A computer in the recorded state at that point. Its outputs up to there are in the recording. Queued inputs
+        are the recorded inputs not yet consumed, so computing can continue with or without a controller.
+    """
+    snapshot = recording.snapshot_before(instruction_count)
+    computer = IntcodeComputer([], **kwargs)
+    computer.restore(snapshot)
+    computer.feed(recording.inputs(since=snapshot.instruction_count))
+    computer.set_limits(instructions=instruction_count - snapshot.instruction_count)
+    try:
+        computer.run_until_input()
+    except ExecutionLimitExceeded:
+        pass
+    finally:
+        computer.set_limits()
+    return computer
+
+
+def record_session(computer: IntcodeComputer, inputs: Iterable[int], snapshot_interval: int = 100000) -> Recording:
+    """Record a non-interactive session: the computer runs with the given inputs until it halts or needs more."""
+    recorder = IntcodeRecorder(computer, snapshot_interval)
+    recorder.add_inputs(*inputs)
+    recorder.run_until_input()
+    return recorder.recording
+
+
+def replay(recording: Recording, **kwargs) -> List[Event]:
+    """Run the whole recorded session again from its first snapshot with the recorded inputs, without the controller.
+
+    Returns:
+        The events of the replay, which equal the recorded events when the program is deterministic.
+    """
+    computer = IntcodeComputer([], **kwargs)
+    computer.restore(recording.snapshots[0])
+    return record_session(computer, recording.inputs(), snapshot_interval=sys.maxsize).events
@@ -0,0 +1,146 @@
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+NOUN_ADDRESS = 1
+VERB_ADDRESS = 2
+
+
+class Polynomial:
+    """Polynomial in two variables, noun and verb, with integer coefficients.
+
+    Terms are stored as a dict from (noun exponent, verb exponent) to coefficient. Zero coefficients are dropped.
+    """
+    __slots__ = ('terms',)
+
+    def __init__(self, terms: Optional[Dict[Tuple[int, int], int]] = None):
+        self.terms = {k: v for k, v in terms.items() if v} if terms else {}
+
+    @classmethod
+    def constant(cls, value: int) -> 'Polynomial':
+        return cls({(0, 0): value})
+
+    def __add__(self, other: 'Polynomial') -> 'Polynomial':
+        terms = dict(self.terms)
+        for k, v in other.terms.items():
+            terms[k] = terms.get(k, 0) + v
+        return Polynomial(terms)
+
+    def __mul__(self, other: 'Polynomial') -> 'Polynomial':
+        terms: Dict[Tuple[int, int], int] = {}
+        for (n1, v1), c1 in self.terms.items():
+            for (n2, v2), c2 in other.terms.items():
+                key = (n1 + n2, v1 + v2)
+                terms[key] = terms.get(key, 0) + c1 * c2
+        return Polynomial(terms)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Polynomial):
+            return self.terms == other.terms
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        if not self.terms:
+            return '0'
+        parts = []
+        for (n, v), c in sorted(self.terms.items(), reverse=True):
+            factors = ([str(c)] if c != 1 or (n, v) == (0, 0) else []) + \
+                (['noun' if n == 1 else f'noun^{n}'] if n else []) + (['verb' if v == 1 else f'verb^{v}'] if v else [])
+            parts.append('*'.join(factors))
+        return ' + '.join(parts)
+
+    @property
+    def constant_value(self) -> Optional[int]:
+        """The value of the polynomial if it does not depend on noun or verb, otherwise None."""
+        if not self.terms:
+            return 0
+        if list(self.terms) == [(0, 0)]:
+            return self.terms[(0, 0)]
+        return None
+
+    def evaluate(self, noun: int, verb: int) -> int:
+        return sum(c * noun ** n * verb ** v for (n, v), c in self.terms.items())
+
+    def verb_coefficients(self, noun: int) -> List[int]:
+        """Substitutes the noun and returns coefficients of the remaining polynomial in verb, lowest degree first."""
+        degree = max((v for _, v in self.terms), default=0)
+        coefficients = [0] * (degree + 1)
+        for (n, v), c in self.terms.items():
+            coefficients[v] += c * noun ** n
+        return coefficients
+
+
+def evaluate_symbolically(intcode: Sequence[int]) -> Optional[Polynomial]:
+    """Runs a straight-line add/multiply program with noun and verb (addresses 1 and 2) as variables.
+
+    Values read through an address that depends on noun or verb are unknown. Unknown values may be written to known
+    addresses and overwritten later, which is what day 2 programs do with their first instruction.
+
+    Returns:
+        The closed-form expression at address 0 after the program halts, or None if the program is not straight-line
+        (jumps, input, output or relative mode), uses an unknown opcode or address, or leaves address 0 unknown.
+    """
+    if len(intcode) <= VERB_ADDRESS:
+        return None
+    memory: List[Optional[Polynomial]] = [Polynomial.constant(x) for x in intcode]
+    memory[NOUN_ADDRESS] = Polynomial({(1, 0): 1})
+    memory[VERB_ADDRESS] = Polynomial({(0, 1): 1})
+
+    def read(address: int) -> Optional[Polynomial]:
+        return memory[address] if address < len(memory) else Polynomial()
+
+    def resolve(parameter: int, mode: int) -> Optional[int]:
+        """Returns the address of a parameter, or None if it is not known."""
+        if mode == 1:
+            return parameter
+        if mode != 0:
+            return None
+        cell = read(parameter)
+        return cell.constant_value if cell is not None else None
+
+    ip = 0
+    while ip < len(memory):
+        cell = memory[ip]
+        instruction = cell.constant_value if cell is not None else None
+        if instruction is None or instruction < 0:
+            return None
+        opcode = instruction % 100
+        if opcode == 99:
+            return memory[0]
+        if opcode not in (1, 2) or ip + 3 >= len(memory):
+            return None
+        addresses = [resolve(ip + i, instruction // 10 ** (i + 1) % 10) for i in (1, 2, 3)]
+        if addresses[2] is None or addresses[2] < 0:
+            return None
+        a, b = (read(address) if address is not None and address >= 0 else None for address in addresses[:2])
+        result = None
+        if a is not None and b is not None:
+            result = a + b if opcode == 1 else a * b
+        if addresses[2] >= len(memory):
+            memory.extend([Polynomial()] * (addresses[2] + 1 - len(memory)))
+        memory[addresses[2]] = result
+        ip += 4
+    return None
+
+
+def solve(expression: Polynomial, expected_output: int, nouns: Sequence[int],
+          verbs: Sequence[int]) -> Iterator[Tuple[int, int]]:
+    """Yields noun and verb pairs for which the expression equals the expected output, in search order.
+
+    Expressions that are at most linear in verb are solved directly for each noun, higher degrees are scanned.
+    """
+    for noun in nouns:
+        coefficients = expression.verb_coefficients(noun)
+        while len(coefficients) > 1 and not coefficients[-1]:
+            coefficients.pop()
+        if len(coefficients) == 1:
+            if coefficients[0] == expected_output:
+                yield from ((noun, verb) for verb in verbs)
+        elif len(coefficients) == 2:
+            constant, slope = coefficients
+            if (expected_output - constant) % slope == 0:
+                verb = (expected_output - constant) // slope
+                if verb in verbs:
+                    yield noun, verb
+        else:
+            for verb in verbs:
+                if sum(c * verb ** i for i, c in enumerate(coefficients)) == expected_output:
+                    yield noun, verb
@@ -0,0 +1,43 @@
+import multiprocessing
+from functools import partial
+from typing import Any, Callable, Iterable, Iterator, TypeVar
+
+State = TypeVar('State')
+Task = TypeVar('Task')
+Result = TypeVar('Result')
+
+# State of the pool running in this worker process, built by _init_worker when the worker starts
+_worker_state: Any = None
+
+
+def _init_worker(setup: Callable[..., Any], setup_args: tuple):
+    global _worker_state
+    _worker_state = setup(*setup_args)
+
+
+def _run_task(function: Callable[[Any, Any], Any], task: Any) -> Any:
+    return function(_worker_state, task)
+
+
+def imap(function: Callable[[State, Task], Result], tasks: Iterable[Task], workers: int,
+         setup: Callable[..., State], *setup_args, ordered: bool = True) -> Iterator[Result]:
+    """Runs tasks in a pool of worker processes that each build their own state once.
+
+    Every worker calls setup(*setup_args) when it starts and keeps the result, so large or expensive state such as
+    an Intcode computer is sent to each worker once instead of with every task, and caches built by one task are
+    reused by the next tasks of the same worker.
+
+    Arguments:
+        function: Module-level function called as function(state, task) in the workers.
+        tasks: Tasks to run.
+        workers: Number of worker processes.
+        setup: Module-level function that builds the state of a worker.
+        setup_args: Arguments of setup, sent to each worker once.
+        ordered: Yield the results in task order. Otherwise they are yielded as soon as they are ready.
+
+    Returns:
+        An iterator over the results of the tasks. The pool is closed once the iterator is exhausted.
+    """
+    with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(setup, setup_args)) as pool:
+        run = pool.imap if ordered else pool.imap_unordered
+        yield from run(partial(_run_task, function), tasks)
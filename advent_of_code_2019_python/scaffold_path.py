@@ -0,0 +1,159 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np  # type: ignore
+
+from advent_of_code_2019_python.grid import GrowableGrid
+from advent_of_code_2019_python.intcode_computer import IntcodeComputer
+
+# A turn ('L' or 'R') followed by a number of steps forward
+Move = Tuple[str, int]
+
+# Row and column step of each robot direction
+DIRECTIONS = {ord('^'): (-1, 0), ord('>'): (0, 1), ord('v'): (1, 0), ord('<'): (0, -1)}
+SCAFFOLD = ord('#')
+FUNCTION_NAMES = 'ABC'
+# Maximum length of the main routine and of each function, in characters without the newline
+MAX_LENGTH = 20
+
+
+def trace_scaffold(array: np.ndarray) -> List[Move]:
+    """Traces the scaffold from the robot to the end of the scaffold, going straight through intersections.
+
+    Arguments:
+        array: Camera view from day17.populate_array, with the robot on the scaffold.
+
+    Returns:
+        The moves that visit the whole path, each a turn followed by the number of steps forward.
+
+    Raises:
+        ValueError: If there is no robot, or if the path leads back onto itself in a loop.
+    """
+    robot = np.argwhere(np.isin(array, list(DIRECTIONS)))
+    if not len(robot):
+        raise ValueError('No robot in the camera view')
+    row, col = (int(x) for x in robot[0])
+    d_row, d_col = DIRECTIONS[int(array[row, col])]
+    rows, cols = array.shape
+
+    def is_scaffold(r: int, c: int) -> bool:
+        return 0 <= r < rows and 0 <= c < cols and array[r, c] == SCAFFOLD
+
+    # Every scaffold cell is passed at most twice, once in each direction through an intersection
+    max_steps = 2 * int(np.count_nonzero(array == SCAFFOLD))
+    total_steps = 0
+    moves: List[Move] = []
+    while True:
+        if is_scaffold(row - d_col, col + d_row):
+            turn, d_row, d_col = 'L', -d_col, d_row
+        elif is_scaffold(row + d_col, col - d_row):
+            turn, d_row, d_col = 'R', d_col, -d_row
+        else:
+            return moves
+        steps = 0
+        while is_scaffold(row + d_row, col + d_col):
+            row += d_row
+            col += d_col
+            steps += 1
+        total_steps += steps
+        if total_steps > max_steps:
+            raise ValueError('The scaffold path loops')
+        moves.append((turn, steps))
+
+
+def _length(moves: Sequence[Move]) -> int:
+    """Length of the moves written as a movement function, e.g. 'R,8,L,10'."""
+    return sum(len(turn) + len(str(steps)) + 2 for turn, steps in moves) - 1
+
+
+def compress(moves: Sequence[Move], function_count: int = len(FUNCTION_NAMES),
+             max_length: int = MAX_LENGTH) -> Optional[Tuple[List[int], List[List[Move]]]]:
+    """Splits moves into a main routine of calls to at most `function_count` movement functions.
+
+    The search walks the moves from the start. At each position it either calls a function whose moves come next,
+    or defines the next function from the moves at this position, trying the longest that fits first. Functions are
+    defined in order, so renamings of the same solution are not searched again. Branches are cut when the calls left
+    could not cover the remaining moves even with the longest function, and positions already known to fail with a
+    given set of functions and at most as many calls used are memoized.
+
+    Arguments:
+        moves: The moves to compress.
+        function_count: Number of functions available.
+        max_length: Maximum length in characters of the main routine and of each function.
+
+    Returns:
+        The main routine as function indices and the moves of each function, or None if there is no decomposition.
+    """
+    moves = tuple(moves)
+    max_calls = (max_length + 1) // 2
+    # Most moves that fit in a function, each move takes at least 4 characters with its comma
+    max_function_moves = (max_length + 1) // 4
+    failed: Dict[Tuple[int, Tuple[Tuple[Move, ...], ...]], int] = {}
+
+    def search(position: int, functions: Tuple[Tuple[Move, ...], ...],
+               calls: Tuple[int, ...]) -> Optional[Tuple[Tuple[int, ...], Tuple[Tuple[Move, ...], ...]]]:
+        if position == len(moves):
+            return calls, functions
+        calls_left = max_calls - len(calls)
+        longest = max_function_moves if len(functions) < function_count else max(len(f) for f in functions)
+        if calls_left * longest < len(moves) - position:
+            return None
+        key = (position, functions)
+        if failed.get(key, max_calls + 1) <= len(calls):
+            return None
+        for index, function in enumerate(functions):
+            if moves[position:position + len(function)] == function:
+                result = search(position + len(function), functions, calls + (index,))
+                if result is not None:
+                    return result
+        if len(functions) < function_count:
+            for end in range(min(len(moves), position + max_function_moves), position, -1):
+                function = moves[position:end]
+                if _length(function) > max_length or function in functions:
+                    continue
+                result = search(end, functions + (function,), calls + (len(functions),))
+                if result is not None:
+                    return result
+        failed[key] = len(calls)
+        return None
+
+    result = search(0, (), ())
+    if result is None:
+        return None
+    calls, functions = result
+    return list(calls), [list(function) for function in functions]
+
+
+def movement_input(main_routine: Sequence[int], functions: Sequence[Sequence[Move]], video: bool = False) -> str:
+    """The ASCII input of the movement routine: the main routine, each function and the video feed answer."""
+    lines = [','.join(FUNCTION_NAMES[index] for index in main_routine)]
+    for index in range(len(FUNCTION_NAMES)):
+        function = functions[index] if index < len(functions) else []
+        lines.append(','.join(f'{turn},{steps}' for turn, steps in function))
+    lines.append('y' if video else 'n')
+    return '\n'.join(lines) + '\n'
+
+
+def collect_dust(intcode_computer: IntcodeComputer, main_routine: Sequence[int],
+                 functions: Sequence[Sequence[Move]]) -> int:
+    """Wakes up the robot, gives it the movement routine in one batch and returns the amount of dust collected."""
+    intcode_computer.intcode[0] = 2
+    intcode_computer.feed(ord(c) for c in movement_input(main_routine, functions))
+    return intcode_computer.run_until_input()[-1]
+
+
+def draw_scaffold(moves: Sequence[Move]) -> np.ndarray:
+    """Draws the scaffold that a robot starting upwards follows with the given moves, as a camera view.
+
+    Used to make synthetic scaffolds. Paths that run along themselves trace back differently than drawn.
+    """
+    grid = GrowableGrid(dtype=np.uint8, default=ord('.'))
+    row, col = 0, 0
+    d_row, d_col = -1, 0
+    for turn, steps in moves:
+        d_row, d_col = (-d_col, d_row) if turn == 'L' else (d_col, -d_row)
+        for _ in range(steps):
+            row += d_row
+            col += d_col
+            grid.set(col, row, SCAFFOLD)
+    grid.set(0, 0, ord('^'))
+    return grid.to_array()
@@ -0,0 +1,45 @@
+import asyncio
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.async_intcode import AsyncIntcodeComputer, connect, pipeline, ring, run_network, star
+
+# Reads a value, outputs it plus one and halts
+INCREMENT = [3, 9, 1001, 9, 1, 9, 4, 9, 99, 0]
+# Adds the two inputs and outputs the sum
+ADD = [3, 11, 3, 12, 1, 11, 12, 11, 4, 11, 99, 0, 0]
+# Feedback example from day 7
+FEEDBACK = [3, 26, 1001, 26, -4, 26, 3, 27, 1002, 27, 2, 27, 1, 27, 26, 27, 4, 27, 1001, 28, -1, 28, 1005, 28, 6, 99,
+            0, 0, 5]
+
+
+def test_pipeline():
+    async def run():
+        computers = [AsyncIntcodeComputer(IntcodeComputer(INCREMENT)) for _ in range(4)]
+        connect(computers, pipeline(4))
+        computers[0].send(10)
+        return await run_network(computers)
+    assert asyncio.run(run()) == [[11], [12], [13], [14]]
+
+
+def test_ring():
+    async def run():
+        computers = [AsyncIntcodeComputer(IntcodeComputer(FEEDBACK)) for _ in range(5)]
+        connect(computers, ring(5))
+        for computer, phase_setting in zip(computers, [9, 8, 7, 6, 5]):
+            computer.send(phase_setting)
+        computers[0].send(0)
+        await run_network(computers)
+        return computers[-1].outputs[-1]
+    assert asyncio.run(run()) == 139629729
+
+
+def test_star():
+    async def run():
+        computers = [AsyncIntcodeComputer(IntcodeComputer(INCREMENT))] + \
+            [AsyncIntcodeComputer(IntcodeComputer(ADD)) for _ in range(3)]
+        connect(computers, star(4))
+        for i, computer in enumerate(computers[1:]):
+            computer.send(i)
+        computers[0].send(1)
+        return await run_network(computers)
+    assert asyncio.run(run()) == [[2], [2], [3], [4]]
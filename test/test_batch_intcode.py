@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.batch_intcode import BatchIntcodeComputer
+
+# Outputs 999 if the input is below 8, 1000 if it is 8 and 1001 if it is greater than 8
+COMPARE_TO_8 = [3, 21, 1008, 21, 8, 20, 1005, 20, 22, 107, 8, 21, 20, 1006, 20, 31, 1106, 0, 36, 98, 0, 0, 1002, 21,
+                125, 20, 4, 20, 1105, 1, 46, 104, 999, 1105, 1, 46, 1101, 1000, 1, 20, 4, 20, 1105, 1, 46, 98, 99]
+
+
+def test_divergent_instruction_pointers():
+    values = np.arange(5, 12)
+    batch = BatchIntcodeComputer(COMPARE_TO_8, len(values), inputs=values.reshape(-1, 1))
+    batch.run()
+    assert batch.halted.all()
+    expected = []
+    for value in values:
+        intcode_computer = IntcodeComputer(COMPARE_TO_8)
+        intcode_computer.set_inputs(int(value))
+        expected.append(list(intcode_computer.outputs()))
+    assert batch.outputs == expected
+
+
+def test_relative_base_and_growth():
+    intcode = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    batch = BatchIntcodeComputer(intcode, 3)
+    batch.run()
+    assert batch.outputs == [intcode] * 3
+
+
+def test_memory_rows_are_independent():
+    batch = BatchIntcodeComputer([1, 0, 0, 0, 99], 3)
+    batch.memory[:, 1] = [0, 1, 4]
+    batch.run()
+    assert batch.memory[:, 0].tolist() == [2, 2, 100]
+
+
+def test_overflow():
+    batch = BatchIntcodeComputer([1102, 2 ** 62, 4, 7, 99, 0, 0, 0], 2)
+    with pytest.raises(OverflowError):
+        batch.run()
@@ -1,4 +1,6 @@
-from advent_of_code_2019_python.day10 import find_best_location, Coord, vaporize_asteroids
+from advent_of_code_2019_python import day10
+from advent_of_code_2019_python.day10 import (Coord, count_visible, direction_index, find_best_location,
+                                              vaporize_asteroids)
 
 
 def test_find_best_location():
@@ -14,3 +16,54 @@ def test_vaporize_asteroids():
     location = Coord(3, 3)
     vaporized = vaporize_asteroids(asteroids, location)
     assert vaporized == [Coord(3, 2), Coord(4, 3), Coord(2, 4), Coord(3, 1)]
+
+
+LARGE_EXAMPLE = ['.#..##.###...#######',
+                 '##.############..##.',
+                 '.#.######.########.#',
+                 '.###.#######.####.#.',
+                 '#####.##.#.##.###.##',
+                 '..#####..#.#########',
+                 '####################',
+                 '#.####....###.#.#.##',
+                 '##.#################',
+                 '#####.##.###..####..',
+                 '..######..##.#######',
+                 '####.##.####...##..#',
+                 '.#####..#.######.###',
+                 '##...#.##########...',
+                 '#.##########.#######',
+                 '.####.#.###.###.#.##',
+                 '....##.##.###..#####',
+                 '.#.#.###########.###',
+                 '#.#.#.#####.####.###',
+                 '###.##.####.##.#..##']
+
+
+def _large_example():
+    return {Coord(x, y) for y, line in enumerate(LARGE_EXAMPLE) for x, c in enumerate(line) if c == '#'}
+
+
+def test_large_example():
+    asteroids = _large_example()
+    location, visible_asteroids = find_best_location(asteroids)
+    assert location == Coord(11, 13)
+    assert visible_asteroids == 210
+    vaporized = vaporize_asteroids(asteroids, location)
+    assert vaporized[:3] == [Coord(11, 12), Coord(12, 1), Coord(12, 2)]
+    assert vaporized[199] == Coord(8, 2)
+    assert vaporized[-1] == Coord(11, 1)
+    assert len(vaporized) == len(asteroids) - 1
+
+
+def test_count_visible_without_table(monkeypatch):
+    asteroids = _large_example()
+    expected = count_visible(asteroids)
+    monkeypatch.setattr(day10, '_MAX_TABLE_SIZE', 0)
+    assert count_visible(asteroids) == expected
+
+
+def test_direction_index():
+    index = direction_index({Coord(3, 2), Coord(3, 3), Coord(3, 1), Coord(4, 3), Coord(2, 4)}, Coord(3, 3))
+    assert index == {Coord(0, -1): [Coord(3, 2), Coord(3, 1)], Coord(1, 0): [Coord(4, 3)], Coord(-1, 1): [Coord(2, 4)]}
+    assert list(index) == [Coord(0, -1), Coord(1, 0), Coord(-1, 1)]
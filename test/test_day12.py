@@ -1,4 +1,10 @@
-from advent_of_code_2019_python.day12 import apply_gravity, Moon, Coord
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from advent_of_code_2019_python import day12
+from advent_of_code_2019_python.day12 import (apply_gravity, calculate_loop, calculate_total_energy, find_cycle, Moon,
+                                              MoonSystem, Coord)
 
 
 def test_velocity():
@@ -6,3 +12,77 @@ def test_velocity():
     expected = [Moon(Coord(1, 1, 1), Coord(1, 1, 1)), Moon(Coord(1, 1, 1), Coord(-1, -1, -1))]
     apply_gravity(moons, 1)
     assert moons == expected
+
+
+EXAMPLE_1 = [(-1, 0, 2), (2, -10, -7), (4, -8, 8), (3, 5, -1)]
+EXAMPLE_2 = [(-8, -10, 0), (5, 5, 10), (2, -7, 3), (9, -8, -3)]
+
+
+@pytest.mark.parametrize('positions, steps, expected_energy', [(EXAMPLE_1, 10, 179), (EXAMPLE_2, 100, 1940)])
+def test_total_energy(positions, steps, expected_energy):
+    system = MoonSystem(positions)
+    system.step(steps)
+    assert system.total_energy() == expected_energy
+    moons = [Moon(Coord(*position), Coord(0, 0, 0)) for position in positions]
+    apply_gravity(moons, steps)
+    assert calculate_total_energy(moons) == expected_energy
+
+
+def test_gravity_pairwise_and_sorted_agree(monkeypatch):
+    positions = np.random.default_rng(0).integers(-50, 50, size=(200, 3))
+    pairwise = np.sign(positions[np.newaxis, :, :] - positions[:, np.newaxis, :]).sum(axis=1)
+    assert np.array_equal(day12._gravity(positions), pairwise)
+    system = MoonSystem(positions[:20])
+    expected = MoonSystem(positions[:20])
+    expected.step(50)
+    monkeypatch.setattr(day12, 'PAIRWISE_LIMIT', 0)
+    system.step(50)
+    assert np.array_equal(system.positions, expected.positions)
+    assert np.array_equal(system.velocities, expected.velocities)
+
+
+def _moons(positions):
+    return [Moon(Coord(*position), Coord(0, 0, 0)) for position in positions]
+
+
+@pytest.mark.parametrize('positions, expected_steps', [(EXAMPLE_1, 2772), (EXAMPLE_2, 4686774924)])
+def test_calculate_loop(positions, expected_steps):
+    assert calculate_loop(_moons(positions)) == expected_steps
+    assert calculate_loop(_moons(positions), workers=3) == expected_steps
+
+
+def test_find_cycle_from_moving_state():
+    system = MoonSystem(EXAMPLE_1)
+    system.step(5)
+    assert find_cycle(system.positions, system.velocities) == (0, 2772)
+    assert calculate_loop(_moons(EXAMPLE_1), method='brent') == 2772
+    with pytest.raises(ValueError):
+        calculate_loop([Moon(Coord(0, 0, 0), Coord(1, 0, 0))])
+
+
+def test_energy_trajectory(tmp_path):
+    chunks = list(MoonSystem(EXAMPLE_2).energy_trajectory(100, chunk_size=30))
+    assert [len(chunk) for chunk in chunks] == [30, 30, 30, 10]
+    trajectory = np.concatenate(chunks)
+    assert trajectory['step'].tolist() == list(range(1, 101))
+    assert trajectory['total'][-1] == 1940
+    system = MoonSystem(EXAMPLE_2)
+    system.step(10)
+    assert trajectory['total'][9] == system.total_energy()
+    assert np.array_equal(trajectory['potential'][9], system.potential_energy())
+
+    filename = str(tmp_path / 'energy.npy')
+    MoonSystem(EXAMPLE_2).write_energy_trajectory(filename, 100, chunk_size=30)
+    assert np.array_equal(np.load(filename, mmap_mode='r'), trajectory)
+
+
+@pytest.mark.parametrize('steps', [0, 10])
+def test_main_energy_file(tmp_path, steps):
+    input_file = tmp_path / 'input.txt'
+    input_file.write_text('<x=-1, y=0, z=2>\n<x=2, y=-10, z=-7>\n<x=4, y=-8, z=8>\n<x=3, y=5, z=-1>\n')
+    filename = str(tmp_path / 'energy.npy')
+    result = CliRunner().invoke(day12.main, ['--input-file', str(input_file), '--energy-file', filename,
+                                             '--energy-steps', str(steps)])
+    assert result.exit_code == 0, result.output
+    assert len(np.load(filename)) == steps
+    assert result.output.splitlines()[-1].endswith(': 2772')
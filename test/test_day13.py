@@ -0,0 +1,84 @@
+import io
+import os
+
+import numpy as np
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python import day13
+from advent_of_code_2019_python.day13 import ArcadeGame, TerminalRenderer, play_game
+
+INPUT_DAY13 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day13.txt')
+
+
+def test_headless_game():
+    game = ArcadeGame(IntcodeComputer.from_file(INPUT_DAY13))
+    game.frame()
+    assert game.block_count() == 213
+    assert len(game.dirty) == len(game.tiles)
+    screen = np.zeros((25, 45), dtype=np.int8)
+    assert play_game(IntcodeComputer.from_file(INPUT_DAY13), screen) == 11441
+    assert not np.any(screen == 2)
+
+
+def test_renderer_draws_only_changed_tiles():
+    stream = io.StringIO()
+    game = ArcadeGame(IntcodeComputer.from_file(INPUT_DAY13), renderer=TerminalRenderer(stream), max_fps=1e9)
+    game.insert_coins()
+    game.frame()
+    game.render()
+    full_frame = stream.getvalue()
+    assert not game.dirty
+    game.intcode_computer.add_inputs(0)
+    game.frame()
+    # Moving the ball redraws two tiles, its old and new position
+    assert len(game.dirty) == 2
+    game.render()
+    assert len(stream.getvalue()) - len(full_frame) < 100
+    assert game.frames == 2
+
+
+class FakeTime:
+    """Clock that only advances when sleeping, and by a millisecond each time it is read."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def perf_counter(self):
+        self.now += 0.001
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class RecordingRenderer:
+    def __init__(self, clock):
+        self.clock = clock
+        self.times = []
+
+    def render(self, game, dirty):
+        self.times.append(self.clock.now)
+
+    def finish(self, game):
+        pass
+
+
+def test_frames_are_paced(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(day13, 'time', clock)
+    renderer = RecordingRenderer(clock)
+    game = ArcadeGame(IntcodeComputer.from_file(INPUT_DAY13), renderer=renderer, max_fps=20)
+    game.insert_coins()
+    assert game.run() == 11441
+    assert len(renderer.times) == game.frames
+    assert all(b - a >= 1 / 20 - 1e-9 for a, b in zip(renderer.times, renderer.times[1:]))
+    assert game.elapsed >= (game.frames - 1) / 20
+
+
+def test_headless_game_is_not_paced(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(day13, 'time', clock)
+    game = ArcadeGame(IntcodeComputer.from_file(INPUT_DAY13), max_fps=20)
+    game.insert_coins()
+    game.run()
+    assert clock.now < 1
@@ -1,4 +1,24 @@
-from advent_of_code_2019_python.day14 import calculate_ore
+import pytest
+
+from advent_of_code_2019_python.day14 import ReactionGraph, calculate_ore, max_fuel_for_ore, parse_file
+
+EXAMPLE = '''157 ORE => 5 NZVS
+165 ORE => 6 DCFZ
+44 XJWVT, 5 KHKGT, 1 QDVJ, 29 NZVS, 9 GPVTF, 48 HKGWZ => 1 FUEL
+12 HKGWZ, 1 GPVTF, 8 PSHF => 9 QDVJ
+179 ORE => 7 PSHF
+177 ORE => 5 HKGWZ
+7 DCFZ, 7 PSHF => 2 XJWVT
+165 ORE => 2 GPVTF
+3 DCFZ, 7 NZVS, 5 HKGWZ, 10 PSHF => 8 KHKGT
+'''
+
+
+@pytest.fixture
+def example_reactions(tmp_path):
+    input_file = tmp_path / 'input_day14.txt'
+    input_file.write_text(EXAMPLE)
+    return parse_file(str(input_file))
 
 
 def test_calculate_ingredients():
@@ -18,3 +38,46 @@ def test_calculate_ingredients():
                  'B': ({'ORE': 8}, 3),
                  'A': ({'ORE': 9}, 2)}
     assert calculate_ore(reactions) == 165
+
+
+def test_reaction_graph(example_reactions):
+    graph = ReactionGraph(example_reactions)
+    assert graph.order[0] == 'FUEL'
+    assert graph.order[-1] == 'ORE'
+    assert graph.ore_for_fuel() == calculate_ore(example_reactions) == 13312
+    assert graph.ore_for_fuel(82892753) <= 10 ** 12 < graph.ore_for_fuel(82892754)
+
+
+def test_large_amounts_are_exact():
+    graph = ReactionGraph({'FUEL': ({'A': 3}, 1), 'A': ({'ORE': 7}, 2)})
+    fuel = 10 ** 20 + 1
+    assert graph.ore_for_fuel(fuel) == 7 * -(-3 * fuel // 2)
+
+
+def test_cycle():
+    with pytest.raises(ValueError):
+        ReactionGraph({'FUEL': ({'A': 1}, 1), 'A': ({'B': 1}, 1), 'B': ({'A': 1, 'ORE': 1}, 1)})
+
+
+def test_max_fuel_for_ore(example_reactions, monkeypatch):
+    calls = []
+    ore_for_fuel = ReactionGraph.ore_for_fuel
+
+    def counting_ore_for_fuel(self, fuel_amount=1):
+        calls.append(fuel_amount)
+        return ore_for_fuel(self, fuel_amount)
+
+    monkeypatch.setattr(ReactionGraph, 'ore_for_fuel', counting_ore_for_fuel)
+    assert max_fuel_for_ore(example_reactions, 10 ** 12) == 82892753
+    # Each amount is solved once, and the search needs only a handful of them
+    assert len(calls) == len(set(calls))
+    assert len(calls) < 40
+
+
+def test_max_fuel_for_small_budgets(example_reactions):
+    assert max_fuel_for_ore(example_reactions, 13311) == 0
+    assert max_fuel_for_ore(example_reactions, 13312) == 1
+    graph = ReactionGraph(example_reactions)
+    for budget in (2 * 13312, 10 ** 6, 123456789):
+        fuel = max_fuel_for_ore(example_reactions, budget)
+        assert graph.ore_for_fuel(fuel) <= budget < graph.ore_for_fuel(fuel + 1)
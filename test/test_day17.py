@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from advent_of_code_2019_python.day17 import get_intersections, parse_camera
+
+VIEW = ('..#..........\n'
+        '..#..........\n'
+        '#######...###\n'
+        '#.#...#...#.#\n'
+        '#############\n'
+        '..#...#...#..\n'
+        '..#####...^..\n'
+        '\n')
+
+
+def test_parse_camera():
+    array = parse_camera(VIEW.encode())
+    assert array.dtype == np.uint8
+    assert array.shape == (7, 13)
+    assert chr(array[6, 10]) == '^'
+    assert np.array_equal(parse_camera([ord(c) for c in VIEW]), array)
+    with pytest.raises(ValueError):
+        parse_camera(b'##\n#\n')
+
+
+def test_intersections():
+    intersections = get_intersections(parse_camera(VIEW.encode()))
+    assert intersections == [(2, 2), (4, 2), (4, 6), (4, 10)]
+    assert sum(row * col for row, col in intersections) == 76
+
+
+def test_no_intersections_on_border():
+    array = parse_camera(b'.#.\n###\n.#.\n###\n')
+    assert get_intersections(array) == [(1, 1)]
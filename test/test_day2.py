@@ -0,0 +1,33 @@
+import os
+
+import pytest
+from click.testing import CliRunner
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.day2 import find_noun_verb, main
+
+INPUT_DAY2 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day2.txt')
+
+
+@pytest.mark.parametrize('workers, symbolic, batched', [(1, True, False), (1, False, False), (2, False, False),
+                                                        (1, False, True)])
+def test_find_noun_verb(workers, symbolic, batched):
+    # Stores noun + verb at index 0, the first match in search order is returned
+    intcode_computer = IntcodeComputer([1101, 0, 0, 0, 99])
+    assert find_noun_verb(intcode_computer, 150, workers=workers, symbolic=symbolic, batched=batched) == (51, 99)
+    assert find_noun_verb(intcode_computer, 1000, workers=workers, symbolic=symbolic,
+                          batched=batched) is None
+
+
+@pytest.mark.parametrize('workers, symbolic', [(1, True), (1, False), (3, False)])
+def test_find_noun_verb_bounds(workers, symbolic):
+    intcode_computer = IntcodeComputer([1101, 0, 0, 0, 99])
+    assert find_noun_verb(intcode_computer, 350, nouns=range(100, 200), verbs=range(150, 300),
+                          workers=workers, symbolic=symbolic) == (100, 250)
+
+
+@pytest.mark.parametrize('options', [[], ['--brute-force'], ['--brute-force', '--workers', '2']])
+def test_main(options):
+    result = CliRunner().invoke(main, ['--input-file', INPUT_DAY2] + options)
+    assert result.exit_code == 0
+    assert result.output.splitlines()[-1].endswith(': 65 and 33')
@@ -1,7 +1,11 @@
 import pytest
 
 from advent_of_code_2019_python import IntcodeComputer
-from advent_of_code_2019_python.day7 import calculate_max_thruster_signal, calculate_max_thruster_signal_feedback
+from advent_of_code_2019_python.day7 import (PhaseSearch, calculate_max_thruster_signal,
+                                             calculate_max_thruster_signal_feedback, find_best_phase_settings)
+
+# Outputs input signal * 10 + phase setting
+AMPLIFIER = [3, 15, 3, 16, 1002, 16, 10, 16, 1, 16, 15, 15, 4, 15, 99, 0, 0]
 
 
 @pytest.mark.parametrize('intcode, expected_thruster_signal',
@@ -13,6 +17,27 @@ from advent_of_code_2019_python.day7 import calculate_max_thruster_signal, calcu
 def test_thruster_signal(intcode, expected_thruster_signal):
     intcode_computer = IntcodeComputer(intcode)
     assert calculate_max_thruster_signal(intcode_computer) == expected_thruster_signal
+    assert calculate_max_thruster_signal(intcode_computer, batched=True) == expected_thruster_signal
+    assert calculate_max_thruster_signal(intcode_computer, workers=2) == expected_thruster_signal
+
+
+@pytest.mark.parametrize('phases, amplifiers', [(range(7), None), (range(8), 3)])
+def test_phase_search_matches_batched(phases, amplifiers):
+    intcode_computer = IntcodeComputer(AMPLIFIER)
+    expected = calculate_max_thruster_signal(intcode_computer, phases, amplifiers, batched=True)
+    assert calculate_max_thruster_signal(intcode_computer, phases, amplifiers) == expected
+    assert calculate_max_thruster_signal(intcode_computer, phases, amplifiers, workers=2) == expected
+
+
+def test_phase_search_memoizes_amplifier_runs():
+    search = PhaseSearch(IntcodeComputer(AMPLIFIER), range(6))
+    assert search.search(6) == (543210, (5, 4, 3, 2, 1, 0))
+    # One run per node of the permutation trie at most, instead of 6 * 720 for running every permutation
+    assert search.amplifier_runs <= 6 + 30 + 120 + 360 + 720 + 720
+    runs = search.amplifier_runs
+    assert search.search(6) == (543210, (5, 4, 3, 2, 1, 0))
+    assert search.amplifier_runs == runs
+    assert find_best_phase_settings(IntcodeComputer(AMPLIFIER), range(2), amplifiers=3) is None
 
 
 @pytest.mark.parametrize('intcode, expected_thruster_signal',
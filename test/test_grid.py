@@ -0,0 +1,36 @@
+import numpy as np
+
+from advent_of_code_2019_python.grid import GrowableGrid
+
+
+def test_grows_in_every_direction():
+    grid = GrowableGrid(initial_size=2)
+    positions = [(0, 0), (-7, 3), (40, -25), (5, 100), (-300, -2)]
+    for i, (x, y) in enumerate(positions, start=1):
+        grid.set(x, y, i)
+    for i, (x, y) in enumerate(positions, start=1):
+        assert grid[x, y] == i
+    assert grid.get(1000, 1000) == 0
+    assert len(grid) == len(positions)
+    assert grid.bounds() == (-300, -25, 40, 100)
+
+
+def test_written_counts_cells_once():
+    grid = GrowableGrid()
+    grid[1, 1] = 1
+    grid[1, 1] = 0
+    grid[2, 1] = 0
+    assert len(grid) == 2
+    assert grid.written.sum() == 2
+
+
+def test_to_array_any_quadrant():
+    grid = GrowableGrid(initial_size=1)
+    grid[-2, -1] = 1
+    grid[1, 1] = 2
+    expected = np.array([[1, 0, 0, 0],
+                         [0, 0, 0, 0],
+                         [0, 0, 0, 2]])
+    assert np.array_equal(grid.to_array(), expected)
+    assert np.array_equal(grid.to_array(y_up=True), expected[::-1])
+    assert GrowableGrid().to_array().shape == (0, 0)
@@ -0,0 +1,72 @@
+import os
+import pickle
+
+from click.testing import CliRunner
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.day2 import find_noun_verb
+from advent_of_code_2019_python.intcode_image import is_image, load_image, main, map_image, map_memory, write_image
+
+INPUT_DAY9 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day9.txt')
+
+
+def test_roundtrip(tmp_path):
+    intcode = [1, -2, 2 ** 63 - 1, -2 ** 63, 2 ** 70, -2 ** 100, 99]
+    filename = str(tmp_path / 'program.icim')
+    write_image(intcode, filename)
+    assert is_image(filename)
+    assert load_image(filename) == intcode
+    cells = map_image(filename)
+    assert cells.tolist() == [1, -2, 2 ** 63 - 1, -2 ** 63, 0, 0, 99]
+    assert not cells.flags.writeable
+
+
+def test_convert_and_run(tmp_path):
+    result = CliRunner().invoke(main, [INPUT_DAY9, '--output-dir', str(tmp_path)])
+    assert result.exit_code == 0
+    image = str(tmp_path / 'input_day9.icim')
+    assert not is_image(INPUT_DAY9)
+    from_image = IntcodeComputer.from_file(image)
+    from_text = IntcodeComputer.from_file(INPUT_DAY9)
+    assert from_image.intcode_aslist == from_text.intcode_aslist
+    from_image.set_inputs(1)
+    assert from_image.compute() == 3454977209
+
+
+def test_mapped_memory_is_copied_on_write(tmp_path):
+    filename = str(tmp_path / 'program.icim')
+    write_image([1101, 2, 3, 0, 99], filename)
+    computer = IntcodeComputer.from_file(filename)
+    assert computer.intcode.mapped
+    fork = computer.fork()
+    fork.intcode[1] = 5
+    assert not fork.intcode.mapped
+    assert computer.intcode.mapped
+    computer.compute()
+    assert not computer.intcode.mapped
+    assert computer.intcode_aslist == [5, 2, 3, 0, 99]
+    fork.compute()
+    assert fork.intcode_aslist == [8, 5, 3, 0, 99]
+    assert load_image(filename) == [1101, 2, 3, 0, 99]
+
+
+def test_mapped_memory_pickles_as_path(tmp_path):
+    filename = str(tmp_path / 'program.icim')
+    intcode = list(range(100000)) + [99]
+    write_image(intcode, filename)
+    data = pickle.dumps(IntcodeComputer.from_file(filename))
+    assert len(data) < 1000
+    computer = pickle.loads(data)
+    assert computer.intcode.mapped
+    assert computer.intcode_aslist == intcode
+    # Values outside int64 are not in the map, such images are loaded into a list
+    write_image([2 ** 70, 99], filename)
+    assert not map_memory(filename).mapped
+
+
+def test_process_pool_with_image(tmp_path):
+    filename = str(tmp_path / 'program.icim')
+    write_image([1101, 0, 0, 0, 99], filename)
+    computer = IntcodeComputer.from_file(filename)
+    assert find_noun_verb(computer, 150, workers=2, symbolic=False) == (51, 99)
+    assert computer.intcode.mapped
@@ -0,0 +1,62 @@
+import os
+
+import numpy as np
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.day13 import play_game
+from advent_of_code_2019_python.intcode_jit import JIT_THRESHOLD, compile_block
+
+INPUTS = os.path.join(os.path.dirname(__file__), '..', 'inputs')
+
+
+def _self_modifying_sum(iterations):
+    # ACC += n, where the loop increments n by rewriting the immediate operand of the addition
+    intcode = [1001, 41, 1, 41, 1001, 2, 1, 2, 1001, 40, -1, 40, 1005, 40, 0, 4, 41, 99] + [0] * 22 + [iterations, 0]
+    return intcode
+
+
+def test_compile_block():
+    cells = [1001, 41, 1, 41, 1005, 40, 0, 99]
+    end, block = compile_block(cells, 0)
+    assert end == 7
+    cells += [0] * 34
+    cells[40] = 1
+    ip, relative_base, executed = block(cells, 0, {}, {}, None)
+    assert (ip, relative_base, executed) == (0, 0, 2)
+    assert cells[41] == 1
+    assert compile_block([4, 0, 99], 0) is None
+
+
+def test_self_modifying_block():
+    for jit in [False, True]:
+        intcode_computer = IntcodeComputer(_self_modifying_sum(3 * JIT_THRESHOLD), jit=jit)
+        assert intcode_computer.compute() == sum(range(1, 3 * JIT_THRESHOLD + 1))
+
+
+def test_external_write_invalidates_block():
+    # Outputs the value at address 1 forever
+    intcode_computer = IntcodeComputer([1101, 5, 0, 20, 4, 20, 1105, 1, 0], jit=True)
+    for _ in range(3 * JIT_THRESHOLD):
+        assert intcode_computer.compute() == 5
+    assert intcode_computer.intcode.blocks
+    intcode_computer.intcode[1] = 7
+    assert not intcode_computer.intcode.blocks
+    assert intcode_computer.compute() == 7
+
+
+def test_matches_reference_day9():
+    results = []
+    for jit in [False, True]:
+        intcode_computer = IntcodeComputer.from_file(os.path.join(INPUTS, 'input_day9.txt'), jit=jit)
+        intcode_computer.set_inputs(2)
+        results.append((list(intcode_computer.outputs()), intcode_computer.instruction_count))
+    assert results[0] == results[1]
+
+
+def test_matches_reference_day13():
+    scores = []
+    for jit in [False, True]:
+        intcode_computer = IntcodeComputer.from_file(os.path.join(INPUTS, 'input_day13.txt'), jit=jit)
+        scores.append((play_game(intcode_computer, np.zeros((25, 45), dtype=np.int8)),
+                       intcode_computer.instruction_count, intcode_computer.intcode_aslist))
+    assert scores[0] == scores[1]
@@ -0,0 +1,98 @@
+import copy
+import os
+import sys
+import time
+from collections import defaultdict
+
+import pytest
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.intcode_memory import IntcodeMemory
+
+INPUT_DAY9 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day9.txt')
+
+
+def test_unwritten_cells_read_as_zero():
+    memory = IntcodeMemory([1, 2, 3])
+    assert memory[1] == 2
+    assert memory[1000] == 0
+    assert len(memory) == 3
+
+
+def test_write_past_end_grows():
+    memory = IntcodeMemory([1, 2, 3])
+    memory[5] = 7
+    assert memory.tolist() == [1, 2, 3, 0, 0, 7]
+
+
+def test_negative_address():
+    memory = IntcodeMemory([1, 2, 3])
+    with pytest.raises(IndexError):
+        memory[-1]
+    with pytest.raises(IndexError):
+        memory[-1] = 0
+
+
+def test_arbitrary_precision():
+    intcode = [1102, 2 ** 62, 2 ** 62, 7, 4, 7, 99, 0]
+    intcode_computer = IntcodeComputer(intcode)
+    assert intcode_computer.compute() == 2 ** 124
+
+
+def test_write_order_independent_of_access_order():
+    # Read far past the end first, then write in between: memory stays ordered by address
+    intcode = [1001, 50, 0, 10, 99]
+    intcode_computer = IntcodeComputer(intcode)
+    intcode_computer.compute()
+    assert intcode_computer.intcode_aslist == [1001, 50, 0, 10, 99, 0, 0, 0, 0, 0, 0]
+
+
+def test_copy_is_independent():
+    memory = IntcodeMemory([1, 2, 3])
+    clone = copy.deepcopy(memory)
+    clone[0] = 5
+    assert memory[0] == 1
+    assert clone[0] == 5
+
+
+def test_benchmark_boost_program():
+    with open(INPUT_DAY9) as f:
+        program = [int(x) for x in f.read().rstrip('\n').split(',')]
+    dict_memory = defaultdict(int, enumerate(program))
+    list_memory = IntcodeMemory(program)
+    dict_size = sys.getsizeof(dict_memory)
+    list_size = sys.getsizeof(list_memory.cells)
+    print(f'Bytes per cell: defaultdict {dict_size / len(program):.1f}, IntcodeMemory {list_size / len(program):.1f}')
+    assert list_size < dict_size
+
+    start = time.perf_counter()
+    for _ in range(100):
+        copy.deepcopy(dict_memory)
+    dict_clone = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(100):
+        copy.deepcopy(list_memory)
+    list_clone = time.perf_counter() - start
+    print(f'Clone time: defaultdict {dict_clone / 100 * 1e6:.1f} us, IntcodeMemory {list_clone / 100 * 1e6:.1f} us')
+
+    intcode_computer = IntcodeComputer(program)
+    intcode_computer.set_inputs(1)
+    start = time.perf_counter()
+    output = intcode_computer.compute()
+    elapsed = time.perf_counter() - start
+    print(f'BOOST test mode: {intcode_computer.instruction_count / elapsed:.0f} instructions per second')
+    assert output == 3454977209
+
+
+def test_fork_copy_on_write():
+    memory = IntcodeMemory([1, 2, 3])
+    fork = memory.fork()
+    assert fork.cells is memory.cells
+    fork[0] = 5
+    assert fork.cells is not memory.cells
+    assert memory.tolist() == [1, 2, 3]
+    assert fork.tolist() == [5, 2, 3]
+    # The original is the last owner and does not need to copy
+    cells = memory.cells
+    memory[1] = 7
+    assert memory.cells is cells
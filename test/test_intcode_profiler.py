@@ -0,0 +1,58 @@
+import json
+import os
+import time
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.intcode_profiler import IntcodeProfiler
+
+QUINE = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+INPUT_DAY9 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day9.txt')
+
+
+def test_profile_counts():
+    profiler = IntcodeProfiler()
+    intcode_computer = IntcodeComputer(QUINE, profiler=profiler)
+    outputs = list(intcode_computer.outputs())
+    assert outputs == QUINE
+    assert profiler.instruction_count == intcode_computer.instruction_count
+    assert profiler.opcodes[9] == 16
+    assert profiler.addresses[0] == 16
+    assert profiler.writes[100] == 16
+    assert profiler.relative_base_adjustments == {1: 16}
+    assert profiler.hot_addresses(1) == [(0, 16)]
+
+
+def test_input_wait():
+    profiler = IntcodeProfiler()
+    intcode_computer = IntcodeComputer([3, 0, 4, 0, 99], profiler=profiler)
+    assert intcode_computer.run_until_input() == []
+    time.sleep(0.01)
+    intcode_computer.add_inputs(5)
+    assert intcode_computer.run_until_input() == [5]
+    assert profiler.input_wait >= 0.01
+    assert profiler.opcodes[3] == 1
+
+
+def test_exports(tmp_path):
+    profiler = IntcodeProfiler()
+    intcode_computer = IntcodeComputer(QUINE, profiler=profiler)
+    list(intcode_computer.outputs())
+    profiler.write_json(str(tmp_path / 'profile.json'))
+    with open(tmp_path / 'profile.json') as f:
+        profile = json.load(f)
+    assert profile['opcodes']['adjust_relative_base'] == 16
+    profiler.write_collapsed(str(tmp_path / 'profile.folded'))
+    with open(tmp_path / 'profile.folded') as f:
+        lines = f.read().splitlines()
+    assert 'intcode;block@0;adjust_relative_base@0 16' in lines
+    assert sum(int(line.rsplit(' ', 1)[1]) for line in lines) == profiler.instruction_count
+
+
+def test_profiled_run_matches():
+    profiler = IntcodeProfiler()
+    profiled = IntcodeComputer.from_file(INPUT_DAY9, jit=True, profiler=profiler)
+    profiled.set_inputs(1)
+    plain = IntcodeComputer.from_file(INPUT_DAY9)
+    plain.set_inputs(1)
+    assert list(profiled.outputs()) == list(plain.outputs())
+    assert profiler.instruction_count == plain.instruction_count
@@ -0,0 +1,42 @@
+import os
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.day11 import paint_panels
+from advent_of_code_2019_python.intcode_replay import INPUT, OUTPUT, Event, IntcodeRecorder, Recording, replay, seek
+
+# Reads a value, outputs it doubled and starts over
+DOUBLER = [3, 100, 1002, 100, 2, 101, 4, 101, 1105, 1, 0]
+INPUT_DAY11 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day11.txt')
+
+
+def test_record_timestamps():
+    recorder = IntcodeRecorder(IntcodeComputer(DOUBLER))
+    recorder.add_inputs(1, 2)
+    assert recorder.run_until_input() == [2, 4]
+    assert recorder.recording.events == [Event(0, INPUT, 1), Event(2, OUTPUT, 2),
+                                         Event(4, INPUT, 2), Event(6, OUTPUT, 4)]
+    assert not recorder.halted
+
+
+def test_replay_and_seek_robot(tmp_path):
+    recorder = IntcodeRecorder(IntcodeComputer.from_file(INPUT_DAY11), snapshot_interval=1000)
+    panels = paint_panels(recorder, 0)
+    recording = recorder.recording
+    assert len(panels) == 1951
+    assert len(recording.snapshots) > 10
+    assert replay(recording) == recording.events
+
+    middle = recording.instruction_count // 2
+    computer = seek(recording, middle)
+    assert computer.instruction_count == middle
+    assert recording.snapshot_before(middle).instruction_count > 0
+    # Continuing with the remaining recorded inputs gives the rest of the recorded outputs
+    expected = [event.value for event in recording.events if event.kind == OUTPUT and event.instruction_count >= middle]
+    assert computer.run_until_input() == expected
+
+    filename = str(tmp_path / 'day11.icrc')
+    recording.save(filename)
+    loaded = Recording.load(filename)
+    assert loaded.events == recording.events
+    assert [s.instruction_count for s in loaded.snapshots] == [s.instruction_count for s in recording.snapshots]
+    assert seek(loaded, middle).intcode == seek(recording, middle).intcode
@@ -0,0 +1,29 @@
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.intcode_symbolic import Polynomial, evaluate_symbolically, solve
+
+
+def test_evaluate_symbolically():
+    # The first instruction reads through noun and verb as addresses, but its result is overwritten
+    intcode = [1, 0, 0, 3, 1, 1, 2, 3, 2, 3, 17, 3, 1, 3, 18, 0, 99, 10, 7]
+    expression = evaluate_symbolically(intcode)
+    assert expression == Polynomial({(1, 0): 10, (0, 1): 10, (0, 0): 7})
+    for noun, verb in [(0, 0), (3, 5), (12, 2)]:
+        intcode_computer = IntcodeComputer(intcode)
+        intcode_computer.intcode[1] = noun
+        intcode_computer.intcode[2] = verb
+        intcode_computer.compute()
+        assert expression.evaluate(noun, verb) == intcode_computer.intcode[0]
+
+
+def test_evaluate_symbolically_not_straight_line():
+    assert evaluate_symbolically([1105, 1, 4, 0, 99]) is None
+    assert evaluate_symbolically([3, 0, 99]) is None
+    # Address 0 ends up depending on memory read through the noun
+    assert evaluate_symbolically([1, 0, 0, 0, 99]) is None
+
+
+def test_solve():
+    expression = Polynomial({(1, 0): 100, (0, 1): 1})
+    assert list(solve(expression, 1234, range(100), range(100))) == [(12, 34)]
+    quadratic = Polynomial({(0, 2): 1, (1, 0): 1})
+    assert list(solve(quadratic, 10, range(11), range(4))) == [(1, 3), (6, 2), (9, 1), (10, 0)]
@@ -1,6 +1,11 @@
+import itertools
+import os
+import time
+
 import pytest
 
 from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.intcode_computer import ExecutionLimitExceeded, InputRequired
 
 
 @pytest.mark.parametrize('intcode, expected',
@@ -71,3 +76,226 @@ def test_relative_base():
         outputs.append(output)
         output = intcode_computer.compute()
     assert outputs == intcode
+
+
+INPUT_DAY9 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day9.txt')
+
+
+def _run_to_halt(intcode_computer, compute):
+    outputs = []
+    output = compute()
+    while not intcode_computer.halted:
+        outputs.append(output)
+        output = compute()
+    return outputs
+
+
+@pytest.mark.parametrize('intcode, inputs',
+                         [([109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99], []),
+                          ([3, 9, 8, 9, 10, 9, 4, 9, 99, -1, 8], [8]),
+                          ([3, 3, 1105, -1, 9, 1101, 0, 0, 12, 4, 12, 99, 1], [0]),
+                          ([1102, 34915192, 34915192, 7, 4, 7, 99, 0], []),
+                          # Parameters past the end of the program read as zero
+                          ([1105, 1, 4, 0, 1101, 99, 0, 0, 1005], [])])
+def test_compute_matches_reference(intcode, inputs):
+    fast = IntcodeComputer(intcode)
+    fast.set_inputs(*inputs)
+    reference = IntcodeComputer(intcode)
+    reference.set_inputs(*inputs)
+    assert _run_to_halt(fast, fast.compute) == _run_to_halt(reference, reference.compute_reference)
+    assert fast.intcode_aslist == reference.intcode_aslist
+    assert fast.instruction_count == reference.instruction_count
+
+
+def test_instruction_past_end_of_memory():
+    assert IntcodeComputer([4]).compute() == IntcodeComputer([4]).compute_reference() == 4
+
+
+def test_benchmark_instructions_per_second():
+    rates = {}
+    outputs = {}
+    for name in ['compute_reference', 'compute']:
+        intcode_computer = IntcodeComputer.from_file(INPUT_DAY9)
+        intcode_computer.set_inputs(1)
+        start = time.perf_counter()
+        outputs[name] = _run_to_halt(intcode_computer, getattr(intcode_computer, name))
+        rates[name] = intcode_computer.instruction_count / (time.perf_counter() - start)
+    print(f'Instructions per second: before {rates["compute_reference"]:.0f}, after {rates["compute"]:.0f}')
+    assert outputs['compute'] == outputs['compute_reference']
+
+
+def test_decode_cache_self_modifying_code():
+    # Loop that rewrites its own output instruction from "output position 13" (4) to "output immediate" (104)
+    intcode = [4, 13, 1101, 100, 4, 0, 1105, 1, 0, 99, 0, 0, 0, 7]
+    intcode_computer = IntcodeComputer(intcode)
+    assert intcode_computer.compute() == 7
+    assert intcode_computer.compute() == 13
+
+
+def test_decode_cache_external_write_invalidates():
+    intcode_computer = IntcodeComputer([104, 1, 1105, 1, 0])
+    assert intcode_computer.compute() == 1
+    intcode_computer.intcode[0] = 99
+    assert intcode_computer.compute() is None
+    assert intcode_computer.halted
+
+
+def test_decode_cache_counters():
+    intcode_computer = IntcodeComputer.from_file(INPUT_DAY9)
+    intcode_computer.set_inputs(2)
+    intcode_computer.compute()
+    print(f'Decode cache: {intcode_computer.decode_hits} hits, {intcode_computer.decode_misses} misses')
+    assert intcode_computer.decode_hits + intcode_computer.decode_misses == intcode_computer.instruction_count
+    assert intcode_computer.decode_hits > 100 * intcode_computer.decode_misses
+
+
+def test_fork_is_independent():
+    intcode_computer = IntcodeComputer([3, 9, 1, 9, 9, 9, 4, 9, 99, 0])
+    fork = intcode_computer.fork()
+    intcode_computer.set_inputs(2)
+    fork.set_inputs(5)
+    assert intcode_computer.compute() == 4
+    assert fork.compute() == 10
+    assert intcode_computer.intcode[9] == 4
+
+
+def test_snapshot_restore():
+    intcode = [109, 1, 204, -1, 1001, 100, 1, 100, 1008, 100, 16, 101, 1006, 101, 0, 99]
+    intcode_computer = IntcodeComputer(intcode)
+    for _ in range(3):
+        intcode_computer.compute()
+    snapshot = intcode_computer.snapshot()
+    first = _run_to_halt(intcode_computer, intcode_computer.compute)
+    intcode_computer.restore(snapshot)
+    second = _run_to_halt(intcode_computer, intcode_computer.compute)
+    assert first == second == intcode[3:]
+
+
+def test_benchmark_fork_cost_is_flat():
+    timings = {}
+    for size in [1000, 100000, 1000000]:
+        intcode_computer = IntcodeComputer([99] + [0] * (size - 1))
+        start = time.perf_counter()
+        for _ in range(1000):
+            intcode_computer.fork()
+        timings[size] = (time.perf_counter() - start) / 1000
+    print('Fork cost: ' + ', '.join(f'{size} cells {t * 1e6:.2f} us' for size, t in timings.items()))
+    assert timings[1000000] < 10 * timings[1000]
+
+
+ECHO_TWICE = [3, 20, 4, 20, 4, 20, 1005, 20, 0, 99]
+
+
+def test_run_until_input():
+    intcode_computer = IntcodeComputer(ECHO_TWICE)
+    assert intcode_computer.run_until_input() == []
+    assert intcode_computer.needs_input
+    intcode_computer.add_inputs(5)
+    assert intcode_computer.run_until_input() == [5, 5]
+    intcode_computer.add_inputs(0)
+    assert intcode_computer.run_until_input() == [0, 0]
+    assert intcode_computer.halted
+
+
+def test_compute_raises_input_required():
+    intcode_computer = IntcodeComputer(ECHO_TWICE)
+    with pytest.raises(InputRequired):
+        intcode_computer.compute()
+    assert intcode_computer.instr_pointer == 0
+    assert intcode_computer.instruction_count == 0
+    intcode_computer.add_inputs(3)
+    assert intcode_computer.compute() == 3
+
+
+def test_outputs_from_iterable_and_callback():
+    intcode_computer = IntcodeComputer(ECHO_TWICE)
+    intcode_computer.feed(iter([1, 2]))
+    remaining = iter([0])
+    intcode_computer.input_callback = lambda: next(remaining, None)
+    assert list(intcode_computer.outputs()) == [1, 1, 2, 2, 0, 0]
+    assert intcode_computer.halted
+
+
+def test_feed_reads_lazily():
+    intcode_computer = IntcodeComputer([3, 20, 4, 20, 3, 20, 4, 20, 99])
+    intcode_computer.feed(itertools.count(5))
+    assert intcode_computer.run_until_input() == [5, 6]
+    assert intcode_computer.halted
+
+    # The generator sees the computer at each input instruction
+    intcode_computer = IntcodeComputer([3, 20, 4, 20, 3, 20, 4, 20, 99])
+    intcode_computer.feed(intcode_computer.instruction_count for _ in range(2))
+    assert intcode_computer.run_until_input() == [0, 2]
+
+
+def test_feed_matches_reference():
+    fast = IntcodeComputer(ECHO_TWICE)
+    fast.feed(itertools.count(2, -1))
+    reference = IntcodeComputer(ECHO_TWICE)
+    reference.feed(itertools.count(2, -1))
+    outputs = _run_to_halt(fast, fast.compute)
+    assert outputs == _run_to_halt(reference, reference.compute_reference) == [2, 2, 1, 1, 0, 0]
+
+
+def test_instruction_budget_is_resumable():
+    intcode_computer = IntcodeComputer.from_file(INPUT_DAY9, jit=True)
+    intcode_computer.set_inputs(1)
+    intcode_computer.set_limits(instructions=100)
+    with pytest.raises(ExecutionLimitExceeded) as exception:
+        intcode_computer.compute()
+    assert exception.value.reason == 'instructions'
+    assert intcode_computer.instruction_count == 100
+    intcode_computer.set_limits()
+    assert intcode_computer.compute() == 3454977209
+
+
+@pytest.mark.parametrize('jit', [False, True])
+def test_deadline(jit):
+    # Infinite loop
+    intcode_computer = IntcodeComputer([1105, 1, 0], jit=jit)
+    intcode_computer.set_limits(seconds=0.05)
+    with pytest.raises(ExecutionLimitExceeded) as exception:
+        intcode_computer.compute()
+    assert exception.value.reason == 'deadline'
+
+
+def test_checkpoint_resume(tmp_path):
+    filename = str(tmp_path / 'day9.ckpt')
+    intcode_computer = IntcodeComputer.from_file(INPUT_DAY9)
+    intcode_computer.set_inputs(2, 7, 8)
+    intcode_computer.enable_checkpoints(filename, 50000)
+    intcode_computer.set_limits(instructions=120000)
+    with pytest.raises(ExecutionLimitExceeded):
+        intcode_computer.compute()
+    resumed = IntcodeComputer.load_checkpoint(filename)
+    assert resumed.instruction_count == 100000
+    assert list(resumed.inputs) == [7, 8]
+    assert resumed.compute() == 50120
+    assert resumed.instruction_count == 371205
+
+
+def test_checkpoint_resume_jit(tmp_path):
+    # Compiled blocks run past the checkpoint interval, checkpoints are written at the next block boundary
+    filename = str(tmp_path / 'day9.ckpt')
+    intcode_computer = IntcodeComputer.from_file(INPUT_DAY9, jit=True)
+    intcode_computer.set_inputs(2)
+    intcode_computer.enable_checkpoints(filename, 50000)
+    assert intcode_computer.compute() == 50120
+    resumed = IntcodeComputer.load_checkpoint(filename)
+    assert 350000 <= resumed.instruction_count < 371205
+    assert resumed.compute() == 50120
+    assert resumed.instruction_count == 371205
+
+
+def test_checkpoints_in_compiled_loop(tmp_path):
+    # Counts iterations at address 100 forever, the loop is compiled and never leaves compiled code by itself
+    filename = str(tmp_path / 'loop.ckpt')
+    intcode_computer = IntcodeComputer([1001, 100, 1, 100, 1105, 1, 0], jit=True)
+    intcode_computer.enable_checkpoints(filename, 1000)
+    intcode_computer.set_limits(seconds=0.2)
+    with pytest.raises(ExecutionLimitExceeded):
+        intcode_computer.compute()
+    resumed = IntcodeComputer.load_checkpoint(filename)
+    assert resumed.instruction_count >= 1000
+    assert resumed.instr_pointer == 0
+    assert resumed.intcode[100] == resumed.instruction_count // 2
@@ -0,0 +1,27 @@
+import os
+
+from advent_of_code_2019_python import process_pool
+
+
+def _setup(offset):
+    return {'offset': offset, 'pid': os.getpid(), 'tasks': 0}
+
+
+def _add_offset(state, task):
+    state['tasks'] += 1
+    return task + state['offset'], state['pid'], state['tasks']
+
+
+def test_imap():
+    results = list(process_pool.imap(_add_offset, range(20), 2, _setup, 100))
+    assert [value for value, _, _ in results] == list(range(100, 120))
+    # State is kept between the tasks of a worker
+    tasks_per_worker = {}
+    for _, pid, tasks in results:
+        tasks_per_worker[pid] = max(tasks_per_worker.get(pid, 0), tasks)
+    assert sum(tasks_per_worker.values()) == 20
+
+
+def test_imap_unordered():
+    results = process_pool.imap(_add_offset, range(20), 3, _setup, 0, ordered=False)
+    assert sorted(value for value, _, _ in results) == list(range(20))
@@ -0,0 +1,81 @@
+import os
+import random
+import time
+
+import pytest
+
+from advent_of_code_2019_python import IntcodeComputer
+from advent_of_code_2019_python.day17 import parse_camera, populate_array
+from advent_of_code_2019_python.scaffold_path import (collect_dust, compress, draw_scaffold, movement_input,
+                                                      trace_scaffold)
+
+INPUT_DAY17 = os.path.join(os.path.dirname(__file__), '..', 'inputs', 'input_day17.txt')
+
+VIEW = ('#######...#####\n'
+        '#.....#...#...#\n'
+        '#.....#...#...#\n'
+        '......#...#...#\n'
+        '......#...###.#\n'
+        '......#.....#.#\n'
+        '^########...#.#\n'
+        '......#.#...#.#\n'
+        '......#########\n'
+        '........#...#..\n'
+        '....#########..\n'
+        '....#...#......\n'
+        '....#...#......\n'
+        '....#...#......\n'
+        '....#####......\n')
+
+
+def _expand(main_routine, functions):
+    return [move for index in main_routine for move in functions[index]]
+
+
+def _staircase(rng, max_length):
+    """Moves of three random functions called in random order. Turns alternate, so the path never meets itself."""
+    functions = []
+    for _ in range(3):
+        function = []
+        while True:
+            pair = [('L', rng.randint(2, 12)), ('R', rng.randint(2, 12))]
+            if len(movement_input([], [function + pair]).split('\n')[1]) > max_length:
+                break
+            function += pair
+        functions.append(function)
+    return _expand([rng.randrange(3) for _ in range((max_length + 1) // 2)], functions)
+
+
+def test_trace_and_compress():
+    moves = trace_scaffold(parse_camera(VIEW.encode()))
+    assert moves == [('R', 8), ('R', 8), ('R', 4), ('R', 4), ('R', 8), ('L', 6), ('L', 2), ('R', 4), ('R', 4),
+                     ('R', 8), ('R', 8), ('R', 8), ('L', 6), ('L', 2)]
+    main_routine, functions = compress(moves)
+    assert _expand(main_routine, functions) == moves
+    for line in movement_input(main_routine, functions).split('\n')[:4]:
+        assert len(line) <= 20
+
+
+def test_no_decomposition():
+    rng = random.Random(0)
+    assert compress([(rng.choice('LR'), rng.randint(2, 4)) for _ in range(40)]) is None
+
+
+def test_collect_dust():
+    moves = trace_scaffold(populate_array(IntcodeComputer.from_file(INPUT_DAY17)))
+    main_routine, functions = compress(moves)
+    assert collect_dust(IntcodeComputer.from_file(INPUT_DAY17), main_routine, functions) == 840248
+
+
+@pytest.mark.parametrize('max_length', [20, 60])
+def test_benchmark_compress_synthetic_scaffolds(max_length):
+    elapsed = 0.0
+    for seed in range(10):
+        moves = _staircase(random.Random(seed), max_length)
+        view = draw_scaffold(moves)
+        assert trace_scaffold(view) == moves
+        start = time.perf_counter()
+        main_routine, functions = compress(moves, max_length=max_length)
+        elapsed += time.perf_counter() - start
+        assert _expand(main_routine, functions) == moves
+    print(f'Compressed {len(moves)} moves on a {view.shape[0]}x{view.shape[1]} scaffold in {elapsed / 10 * 1e3:.2f} ms')